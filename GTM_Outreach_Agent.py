@@ -1,16 +1,329 @@
+import contextvars
+import csv
+import difflib
+import functools
 import json
+import logging
 import os
+import re
+import sqlite3
 import sys
-from typing import Any, Dict, List, Optional
+import tempfile
+import threading
+import time
+import tracemalloc
+import unicodedata
+import uuid
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows: cache files are then only locked between threads
+    fcntl = None
+
+logger = logging.getLogger(__name__)
 
 import streamlit as st
 import pandas as pd
 from agno.agent import Agent
 from agno.memory.v2 import Memory
+from agno.models.message import Message
 from agno.models.openai import OpenAIChat
+from agno.run.response import RunResponse, RunStatus
 from agno.tools.exa import ExaTools
 
 
+# ------------------- Tracing -------------------
+
+class SamplingProfiler(threading.Thread):
+    """Background thread that periodically samples every other thread's Python stack."""
+
+    def __init__(self, interval_ms: float):
+        super().__init__(name="gtm-sampling-profiler", daemon=True)
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            names.update({t.ident: t.name for t in threading.enumerate()})
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def write_folded(self, path: str) -> None:
+        """Write collapsed stacks (flamegraph.pl / speedscope format)."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ChromeTracer:
+    """Collects nested spans as Chrome trace events (open in chrome://tracing or https://ui.perfetto.dev).
+
+    Events are appended to the file in the JSON Array Format (its closing bracket is optional), under a
+    file lock, so several runs or processes can share one file and, with wall-clock microsecond
+    timestamps, one timeline. Past `max_mb` the file is rotated to `<path>.1` and started afresh.
+    """
+
+    def __init__(self, path: str, sample_interval_ms: float = 0, max_mb: float = 50):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._named_threads: set = set()
+        self._saved = 0
+        self.closed = False
+        self._wall_origin = time.time()
+        self._perf_origin = time.perf_counter()
+        self.profiler = SamplingProfiler(sample_interval_ms) if sample_interval_ms > 0 else None
+        if self.profiler:
+            self.profiler.start()
+
+    def now_us(self) -> float:
+        return (self._wall_origin + time.perf_counter() - self._perf_origin) * 1e6
+
+    def add_span(self, name: str, cat: str, start_us: float, end_us: float, args: Dict[str, Any]) -> None:
+        pid, tid = os.getpid(), threading.get_ident()
+        with self._lock:
+            if (pid, tid) not in self._named_threads:
+                self._named_threads.add((pid, tid))
+                self.events.append({
+                    "name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                    "args": {"name": threading.current_thread().name},
+                })
+            self.events.append({
+                "name": name, "cat": cat, "ph": "X", "ts": start_us, "dur": end_us - start_us,
+                "pid": pid, "tid": tid, "args": args,
+            })
+            late = self.closed
+        if late:
+            # Span from a worker that outlived the session (e.g. an abandoned speculative call).
+            self.save()
+
+    def save(self) -> str:
+        """Stop the profiler and append events not yet written to the trace file."""
+        self.closed = True
+        if self.profiler:
+            self.profiler.stop()
+            self.profiler.write_folded(f"{os.path.splitext(self.path)[0]}.folded")
+            self.profiler = None
+        with self._lock:
+            events = self.events[self._saved:]
+            self._saved = len(self.events)
+        if not events:
+            return self.path
+        with _TRACE_FILE_LOCK, locked_file(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    is_array = f.read(1) == "["
+                size = os.path.getsize(self.path)
+            except OSError:
+                is_array, size = False, 0
+            if size and (size > self.max_bytes or not is_array):
+                os.replace(self.path, f"{self.path}.1")
+                size = 0
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(("[\n" if not size else ",\n") + ",\n".join(json.dumps(e) for e in events))
+        return self.path
+
+
+_TRACE_FILE_LOCK = threading.Lock()
+_CURRENT_TRACER: contextvars.ContextVar[Optional[ChromeTracer]] = contextvars.ContextVar("gtm_tracer", default=None)
+
+
+@contextmanager
+def tracing_session(enabled: bool, path: str, sample_interval_ms: float = 0):
+    """Record spans from this context (and threads started via `submit_in_context`) while the block runs."""
+    if not enabled:
+        yield None
+        return
+    tracer = ChromeTracer(path, sample_interval_ms)
+    token = _CURRENT_TRACER.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _CURRENT_TRACER.reset(token)
+        tracer.save()
+
+
+def submit_in_context(executor: ThreadPoolExecutor, fn: Callable, *args: Any) -> Future:
+    """Submit `fn` so it runs with the caller's context variables (and therefore its tracer)."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+@contextmanager
+def trace_span(name: str, cat: str = "pipeline", **args: Any):
+    tracer = _CURRENT_TRACER.get()
+    if tracer is None:
+        yield
+        return
+    start = tracer.now_us()
+    try:
+        yield
+    finally:
+        tracer.add_span(name, cat, start, tracer.now_us(), args)
+
+
+def traced(cat: str = "pipeline"):
+    """Decorator wrapping a function call in a trace span named after the function."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _CURRENT_TRACER.get() is None:
+                return func(*args, **kwargs)
+            with trace_span(func.__name__, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_tool_call(function_name: str, function_call: Callable, arguments: Dict[str, Any]) -> Any:
+    """agno tool hook: records each tool invocation made inside an agent run."""
+    with trace_span(f"tool:{function_name}", "tool", **{k: str(v)[:200] for k, v in arguments.items()}):
+        return function_call(**arguments)
+
+
+# ------------------- Agent Memory -------------------
+
+class BoundedSqliteMemory(Memory):
+    """agno Memory that persists each run's final answer in a local SQLite file with size caps and LRU/TTL eviction.
+
+    Runs are partitioned by (partition, session_id). The first time a session is used, its last
+    `max_runs_per_session` answers are restored as assistant messages (prompts and tool calls are
+    never stored), so a rebuilt agent keeps prior context across reruns and restarts. The database is
+    shared by all threads and worker processes (WAL mode); reads and writes refresh `last_access`, and
+    the table is trimmed to `max_rows` / `max_mb` least-recently-used rows, dropping anything not
+    touched for `ttl_days`.
+    """
+
+    def __init__(
+        self,
+        db_file: Optional[str] = None,
+        partition: str = "default",
+        max_runs_per_session: int = 6,
+        max_rows: int = 2000,
+        max_mb: float = 200,
+        ttl_days: float = 30,
+        **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        self.db_file = db_file or cache_path("agent_memory.sqlite")
+        self.partition = partition
+        self.max_runs_per_session = max_runs_per_session
+        self.max_rows = max_rows
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_days * 86400
+        self.hydrated_sessions: set = set()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS agent_outputs ("
+                "partition TEXT NOT NULL, session_id TEXT NOT NULL, run_id TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL, content TEXT NOT NULL, "
+                "PRIMARY KEY (partition, session_id, run_id))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS agent_outputs_last_access ON agent_outputs (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _hydrate(self, session_id: str) -> None:
+        """Restore the session's most recent answers the first time it is used by this memory."""
+        if session_id in self.hydrated_sessions:
+            return
+        self.hydrated_sessions.add(session_id)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT rowid, run_id, content FROM agent_outputs WHERE partition = ? AND session_id = ? "
+                "ORDER BY created_at DESC LIMIT ?",
+                (self.partition, session_id, self.max_runs_per_session),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE agent_outputs SET last_access = ? WHERE rowid = ?", [(time.time(), row[0]) for row in rows]
+            )
+        restored = [
+            RunResponse(
+                run_id=run_id, session_id=session_id, content=content, status=RunStatus.completed,
+                messages=[Message(role="assistant", content=content)],
+            )
+            for _, run_id, content in reversed(rows)
+        ]
+        if self.runs is None:
+            self.runs = {}
+        self.runs[session_id] = restored + self.runs.get(session_id, [])
+
+    def add_run(self, session_id: str, run: Any) -> None:
+        self._hydrate(session_id)
+        super().add_run(session_id, run)
+        self.runs[session_id] = self.runs[session_id][-self.max_runs_per_session:]
+
+        content = run.content if isinstance(run.content, str) else json.dumps(run.content, default=str)
+        if not content or getattr(run, "status", RunStatus.completed) != RunStatus.completed:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO agent_outputs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.partition, session_id, getattr(run, "run_id", None) or str(now), now, now, len(content), content),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM agent_outputs WHERE last_access < ?", (now - self.ttl_seconds,))
+        count, total_size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM agent_outputs").fetchone()
+        if count <= self.max_rows and total_size <= self.max_bytes:
+            return
+        # Least recently used first; drop rows until both caps are satisfied
+        excess_rows = max(0, count - self.max_rows)
+        excess_bytes = max(0, total_size - self.max_bytes)
+        doomed = []
+        for rowid, size in conn.execute("SELECT rowid, size FROM agent_outputs ORDER BY last_access ASC"):
+            if excess_rows <= 0 and excess_bytes <= 0:
+                break
+            doomed.append((rowid,))
+            excess_rows -= 1
+            excess_bytes -= size
+        conn.executemany("DELETE FROM agent_outputs WHERE rowid = ?", doomed)
+
+    def get_runs(self, session_id: str) -> List[Any]:
+        self._hydrate(session_id)
+        return super().get_runs(session_id)
+
+    def get_messages_from_last_n_runs(self, session_id: str, *args: Any, **kwargs: Any) -> List[Any]:
+        self._hydrate(session_id)
+        return super().get_messages_from_last_n_runs(session_id, *args, **kwargs)
+
+
+def create_agent_memory(partition: str = "default") -> Memory:
+    return BoundedSqliteMemory(partition=partition)
+
+
 # ------------------- Agents and Helpers -------------------
 
 def require_env(var_name: str) -> None:
@@ -19,12 +332,20 @@ def require_env(var_name: str) -> None:
         sys.exit(1)
 
 
-def create_company_finder_agent() -> Agent:
+def cache_path(filename: str) -> str:
+    """Path of a file in the local cache directory (GTM_CACHE_DIR, default .gtm_cache)."""
+    cache_dir = os.getenv("GTM_CACHE_DIR", ".gtm_cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, filename)
+
+
+def create_company_finder_agent(memory_partition: str = "default") -> Agent:
     exa_tools = ExaTools(category="company")
-    memory = Memory()
+    memory = create_agent_memory(memory_partition)
     return Agent(
         model=OpenAIChat(id="gpt-5"),
         tools=[exa_tools],
+        tool_hooks=[trace_tool_call],
         memory=memory,
         add_history_to_messages=True,
         num_history_responses=6,
@@ -66,12 +387,13 @@ def create_company_finder_agent() -> Agent:
     )
 
 
-def create_contact_finder_agent() -> Agent:
+def create_contact_finder_agent(memory_partition: str = "default") -> Agent:
     exa_tools = ExaTools()
-    memory = Memory()
+    memory = create_agent_memory(memory_partition)
     return Agent(
         model=OpenAIChat(id="gpt-4o"),
         tools=[exa_tools],
+        tool_hooks=[trace_tool_call],
         memory=memory,
         add_history_to_messages=True,
         num_history_responses=6,
@@ -121,12 +443,13 @@ def create_contact_finder_agent() -> Agent:
     )
 
 
-def create_phone_finder_agent() -> Agent:
+def create_phone_finder_agent(memory_partition: str = "default") -> Agent:
     exa_tools = ExaTools()
-    memory = Memory()
+    memory = create_agent_memory(memory_partition)
     return Agent(
         model=OpenAIChat(id="gpt-4o"),
         tools=[exa_tools],
+        tool_hooks=[trace_tool_call],
         memory=memory,
         add_history_to_messages=True,
         num_history_responses=6,
@@ -151,12 +474,9 @@ def create_phone_finder_agent() -> Agent:
             "- '[Company Name] press contact phone number'",
             "- '[Company Name] media kit contact information'",
             "",
-            "PHONE NUMBER VALIDATION:",
-            "- Verify format matches country/region standards",
-            "- Direct numbers: 10+ digits, proper area code",
-            "- Office numbers: Often have extensions",
-            "- Mobile numbers: Typically follow standard mobile formats",
-            "- Include country code when available (+1 for US, etc.)",
+            "PHONE NUMBER FORMAT:",
+            "- Copy numbers exactly as published, including any country code and extension",
+            "- Formatting, validation and de-duplication are handled downstream",
             "",
             "PRIORITIZATION (most to least valuable):",
             "1. Direct dial numbers (desk phones)",
@@ -214,8 +534,8 @@ def get_email_style_instruction(style_key: str) -> str:
     return "\n".join(styles.get(style_key, styles["Professional"]))
 
 
-def create_email_writer_agent(style_key: str = "Professional") -> Agent:
-    memory = Memory()
+def create_email_writer_agent(style_key: str = "Professional", memory_partition: str = "default") -> Agent:
+    memory = create_agent_memory(memory_partition)
     style_instruction = get_email_style_instruction(style_key)
     return Agent(
         model=OpenAIChat(id="gpt-5"),
@@ -264,21 +584,51 @@ def create_email_writer_agent(style_key: str = "Professional") -> Agent:
             "- Technology stack or tools mentioned",
             "- Growth indicators or expansion plans",
             "",
+            "COMPANY DRAFTS:",
+            "- Write ONE draft per company; it is personalized per contact afterwards",
+            "- Use {first_name} where the recipient's first name goes (e.g. the greeting)",
+            "- Put {role_line} on its own line where a sentence tying the offering to the recipient's role belongs",
+            "- Use each placeholder exactly once in the body; {first_name} may also appear in the subject",
+            "",
             "OUTPUT FORMAT:",
-            "Return ONLY valid JSON: {\"emails\": [{\"company\": \"Company Name\", \"contact\": \"Contact Name\", \"subject\": \"Subject Line\", \"body\": \"Email body with \\n for line breaks\", \"personalization_used\": \"Brief note on what insight was used\"}]}",
+            "Return ONLY valid JSON: {\"drafts\": [{\"company\": \"Company Name\", \"subject\": \"Subject Line\", \"body\": \"Hi {first_name},\\n\\n...\\n\\n{role_line}\\n\\n...\", \"personalization_used\": \"Brief note on what insight was used\"}]}",
             "",
             "CRITICAL: Each email must feel genuinely researched and personally written. Avoid template-like language."
         ],
     )
 
 
-def create_research_agent() -> Agent:
+def create_email_personalizer_agent(style_key: str = "Professional", memory_partition: str = "default") -> Agent:
+    memory = create_agent_memory(memory_partition)
+    return Agent(
+        model=OpenAIChat(id="gpt-4o-mini"),
+        tools=[],
+        memory=memory,
+        add_history_to_messages=False,
+        session_id="gtm_outreach_email_personalizer",
+        show_tool_calls=False,
+        instructions=[
+            "You are EmailPersonalizerAgent. You adapt an existing company-level outreach draft to each recipient.",
+            "",
+            get_email_style_instruction(style_key).splitlines()[0],
+            "",
+            "For each contact, write ONE sentence (max 30 words) connecting the draft's value proposition to that contact's role and likely priorities.",
+            "Do not repeat the draft, do not greet, do not sign off.",
+            "",
+            "OUTPUT FORMAT:",
+            "Return ONLY valid JSON: {\"lines\": [{\"company\": \"Company Name\", \"contact\": \"Contact Name\", \"role_line\": \"One sentence\"}]}"
+        ],
+    )
+
+
+def create_research_agent(memory_partition: str = "default") -> Agent:
     """Agent to gather interesting insights from company websites and Reddit."""
     exa_tools = ExaTools()
-    memory = Memory()
+    memory = create_agent_memory(memory_partition)
     return Agent(
         model=OpenAIChat(id="gpt-5"),
         tools=[exa_tools],
+        tool_hooks=[trace_tool_call],
         memory=memory,
         add_history_to_messages=True,
         num_history_responses=6,
@@ -327,23 +677,24 @@ def create_research_agent() -> Agent:
             "- 3-5 insights per company maximum",
             "- Each insight should be 1-2 sentences",
             "- Include source type (website, news, reddit, etc.)",
+            "- List the URLs the insights came from under 'sources'",
             "- Focus on insights that show genuine research effort",
             "- Avoid generic insights that could apply to any company",
             "",
             "OUTPUT FORMAT:",
-            "Return ONLY valid JSON: {\"companies\": [{\"name\": \"Company Name\", \"insights\": [\"Recently raised $X Series B to expand into European markets (TechCrunch)\", \"Reddit users praise their customer support response time improvements\", \"Just launched AI-powered features after 6-month development cycle\"]}]}",
+            "Return ONLY valid JSON: {\"companies\": [{\"name\": \"Company Name\", \"insights\": [\"Recently raised $X Series B to expand into European markets (TechCrunch)\", \"Reddit users praise their customer support response time improvements\", \"Just launched AI-powered features after 6-month development cycle\"], \"sources\": [\"https://techcrunch.com/...\"]}]}",
             "",
             "CRITICAL: Insights must be specific enough that mentioning them proves genuine research, not generic industry knowledge."
         ],
     )
 
 
+@traced("parse")
 def extract_json_or_raise(text: str) -> Dict[str, Any]:
     """Extract JSON from a model response with improved error handling."""
     try:
         return json.loads(text)
     except json.JSONDecodeError:
-        import re
         json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```'
         match = re.search(json_pattern, text, re.DOTALL)
         if match:
@@ -362,8 +713,109 @@ def extract_json_or_raise(text: str) -> Dict[str, Any]:
         raise ValueError(f"Failed to parse JSON from response. Response was:\n{text[:500]}...")
 
 
-def run_company_finder(agent: Agent, target_desc: str, offering_desc: str, max_companies: int) -> List[Dict[str, Any]]:
-    prompt = (
+COMPANY_SUFFIXES = {"inc", "incorporated", "corp", "corporation", "co", "company", "llc", "ltd", "limited", "plc", "gmbh", "ag", "sa"}
+
+
+def company_name_key(name: str) -> str:
+    """Lowercase name without punctuation or legal suffixes: "Acme, Inc." -> "acme"."""
+    words = re.findall(r"[a-z0-9]+", str(name or "").lower())
+    return " ".join(w for w in words if w not in COMPANY_SUFFIXES) or " ".join(words)
+
+
+def match_entries_by_name(
+    entries: List[Dict[str, Any]],
+    names: List[str],
+    name_field: str = "name"
+) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """Map each requested name (lowercase) to the model's entry for it; returns (matched, unmatched entries).
+
+    The model often respells names ("Acme, Inc." for "Acme"), so entries are matched on the name
+    without punctuation or legal suffixes, then on the closest similar name, then by position
+    (entries are requested in `names` order).
+    """
+    keys = [name.strip().lower() for name in names]
+    by_name_key = {company_name_key(k): k for k in reversed(keys)}
+    matched: Dict[str, Dict[str, Any]] = {}
+    leftover = []
+    for index, entry in enumerate(entries):
+        key = by_name_key.get(company_name_key(entry.get(name_field)))
+        if key is not None and key not in matched:
+            matched[key] = entry
+        else:
+            leftover.append((index, entry))
+
+    positional = []
+    for index, entry in leftover:
+        free = {company_name_key(k): k for k in keys if k not in matched}
+        close = difflib.get_close_matches(company_name_key(entry.get(name_field)), list(free), n=1, cutoff=0.6)
+        if close:
+            matched[free[close[0]]] = entry
+        else:
+            positional.append((index, entry))
+
+    unmatched = []
+    for index, entry in positional:
+        if len(entries) == len(keys) and keys[index] not in matched:
+            matched[keys[index]] = entry
+        else:
+            unmatched.append(entry)
+    return matched, unmatched
+
+
+class IncrementalArrayParser:
+    """Yields each object of the JSON array under `key` as soon as its closing brace is streamed in."""
+
+    def __init__(self, key: str):
+        self.key_pattern = re.compile(r'"' + re.escape(key) + r'"\s*:\s*\[')
+        self.buffer = ""
+        self.pos: Optional[int] = None
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self.buffer += chunk
+        if self.pos is None:
+            match = self.key_pattern.search(self.buffer)
+            if not match:
+                return []
+            self.pos = match.end()
+
+        completed = []
+        while self.pos < len(self.buffer) and not self.done:
+            ch = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                if self.depth == 0:
+                    self.object_start = self.pos
+                self.depth += 1
+            elif ch == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        item = json.loads(self.buffer[self.object_start:self.pos + 1])
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        completed.append(item)
+            elif ch == "]" and self.depth == 0:
+                self.done = True
+            self.pos += 1
+        return completed
+
+
+def company_finder_prompt(target_desc: str, offering_desc: str, max_companies: int) -> str:
+    return (
         f"MISSION: Find exactly {max_companies} high-quality B2B prospect companies that are strong fits for our offering.\n\n"
         f"TARGET CRITERIA:\n{target_desc}\n\n"
         f"OUR OFFERING:\n{offering_desc}\n\n"
@@ -376,13 +828,54 @@ def run_company_finder(agent: Agent, target_desc: str, offering_desc: str, max_c
         f"For each company, provide: name, website, why_fit (compelling 2-3 sentence explanation), employee_count, growth_signals.\n\n"
         f"Focus on quality over quantity. Reject poor fits."
     )
-    resp = agent.run(prompt)
-    data = extract_json_or_raise(str(resp.content))
+
+
+@traced("stage")
+def run_company_finder_streaming(
+    agent: Agent,
+    target_desc: str,
+    offering_desc: str,
+    max_companies: int,
+    on_company: Callable[[Dict[str, Any]], None]
+) -> List[Dict[str, Any]]:
+    """Stream the company finder's answer, calling on_company for each company as soon as it closes in the stream."""
+    prompt = company_finder_prompt(target_desc, offering_desc, max_companies)
+    parser = IncrementalArrayParser("companies")
+    chunks: List[str] = []
+    dispatched = 0
+    with trace_span("agent.run", "model", agent=agent.session_id, stream=True):
+        for event in agent.run(prompt, stream=True):
+            content = getattr(event, "content", None)
+            if not isinstance(content, str):
+                continue
+            chunks.append(content)
+            for company in parser.feed(content):
+                if dispatched < max_companies:
+                    dispatched += 1
+                    on_company(company)
+    text = "".join(chunks)
+    if not text and getattr(agent, "run_response", None) is not None:
+        text = str(agent.run_response.content)
+    data = extract_json_or_raise(text)
     companies = data.get("companies", [])
     return companies[:max_companies]
 
 
-def run_contact_finder(agent: Agent, companies: List[Dict[str, Any]], target_desc: str, offering_desc: str) -> List[Dict[str, Any]]:
+@traced("stage")
+def run_contact_finder(
+    agent: Agent,
+    companies: List[Dict[str, Any]],
+    target_desc: str,
+    offering_desc: str,
+    known_email_formats: Optional[Dict[str, str]] = None
+) -> List[Dict[str, Any]]:
+    email_requirement = "- Professional email discoverable or inferable\n"
+    if known_email_formats:
+        email_requirement = (
+            f"- Professional email discoverable or inferable, EXCEPT for these companies whose email format "
+            f"is already known locally: {json.dumps(known_email_formats)}. For them, do NOT search for or infer "
+            f"emails - return an empty email with inferred=true unless the address is published directly.\n"
+        )
     prompt = (
         f"MISSION: Find 2-4 high-quality decision makers per company who would evaluate, influence, or champion our offering.\n\n"
         f"TARGET CONTEXT:\n{target_desc}\n\n"
@@ -392,15 +885,17 @@ def run_contact_finder(agent: Agent, companies: List[Dict[str, Any]], target_des
         f"- Director level or above (or equivalent influence)\n"
         f"- Active on LinkedIn or mentioned in recent company content\n"
         f"- Clear connection to our offering area\n"
-        f"- Professional email discoverable or inferable\n\n"
+        f"{email_requirement}\n"
         f"For each contact found, verify current employment and activity level.\n"
         f"Return format: {{\"companies\": [{{\"name\": \"Company\", \"contacts\": [{{\"full_name\": \"Name\", \"title\": \"Title\", \"email\": \"email@company.com\", \"inferred\": false, \"source\": \"source\", \"last_activity\": \"description\"}}]}}]}}"
     )
-    resp = agent.run(prompt)
+    with trace_span("agent.run", "model", agent=agent.session_id):
+        resp = agent.run(prompt)
     data = extract_json_or_raise(str(resp.content))
     return data.get("companies", [])
 
 
+@traced("stage")
 def run_phone_finder(agent: Agent, contacts_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     prompt = (
         f"MISSION: Find professional phone numbers for the contacts below using comprehensive web research.\n\n"
@@ -412,15 +907,16 @@ def run_phone_finder(agent: Agent, contacts_data: List[Dict[str, Any]]) -> List[
         f"4. General office numbers\n\n"
         f"VERIFICATION:\n"
         f"- Mark verified=true only for official company sources\n"
-        f"- Include country codes when available\n"
-        f"- Validate number format and length\n\n"
+        f"- Copy numbers as published; they are normalized and validated locally\n\n"
         f"Return format: {{\"companies\": [{{\"name\": \"Company\", \"contacts\": [{{\"full_name\": \"Name\", \"phone_number\": \"+1-555-123-4567\", \"phone_type\": \"direct\", \"verified\": true, \"source\": \"source\"}}]}}]}}"
     )
-    resp = agent.run(prompt)
+    with trace_span("agent.run", "model", agent=agent.session_id):
+        resp = agent.run(prompt)
     data = extract_json_or_raise(str(resp.content))
     return data.get("companies", [])
 
 
+@traced("stage")
 def run_research(agent: Agent, companies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     prompt = (
         f"MISSION: Gather 3-5 specific, recent insights per company that would demonstrate genuine research in outreach emails.\n\n"
@@ -435,14 +931,59 @@ def run_research(agent: Agent, companies: List[Dict[str, Any]]) -> List[Dict[str
         f"- Recent and relevant to business decisions\n"
         f"- Could naturally be referenced in personalized outreach\n"
         f"- Shows company momentum or strategic direction\n\n"
-        f"Return format: {{\"companies\": [{{\"name\": \"Company\", \"insights\": [\"Specific insight with context and source\"]}}]}}"
+        f"Return format: {{\"companies\": [{{\"name\": \"Company\", \"insights\": [\"Specific insight with context and source\"], \"sources\": [\"https://source-url\"]}}]}}"
     )
-    resp = agent.run(prompt)
+    with trace_span("agent.run", "model", agent=agent.session_id):
+        resp = agent.run(prompt)
     data = extract_json_or_raise(str(resp.content))
     return data.get("companies", [])
 
 
-def run_email_writer(
+ROLE_FOCUS = [
+    (("sales", "revenue", "business development", "sdr", "bdr", "account executive", "cro"), "pipeline and win rates"),
+    (("marketing", "growth", "demand", "brand", "cmo"), "pipeline and campaign efficiency"),
+    (("product",), "release speed and time-to-value"),
+    (("talent", "people", "recruiting", "recruitment", "hr", "human resources", "chro"), "hiring capacity"),
+    (("operations", "chief of staff", "strategy", "partnerships", "coo"), "cross-team execution"),
+    (("ceo", "founder", "co-founder", "president", "owner"), "overall growth"),
+]
+DEFAULT_ROLE_FOCUS = "day-to-day efficiency"
+
+# One role-line template per email style, matching the tone of get_email_style_instruction
+ROLE_LINE_TEMPLATES = {
+    "Professional": "As {title} at {company}, I expect the effect on {focus} will matter most to you.",
+    "Casual": "Since you're {title} at {company}, I figured you'd care most about {focus}.",
+    "Cold": "Bottom line for you as {title} at {company}: this moves {focus}.",
+    "Consultative": "As {title} at {company}, you've likely seen {focus} become a bigger lever than it used to be.",
+}
+
+
+def local_role_line(title: str, company: str, style_key: str = "Professional") -> str:
+    """Role-specific sentence in the email's style, matched on whole words of the contact's title."""
+    lowered = (title or "").lower()
+    focus = next(
+        (f for keywords, f in ROLE_FOCUS if any(re.search(rf"\b{re.escape(k)}\b", lowered) for k in keywords)),
+        DEFAULT_ROLE_FOCUS,
+    )
+    template = ROLE_LINE_TEMPLATES.get(style_key, ROLE_LINE_TEMPLATES["Professional"])
+    return template.format(title=title or "part of the team", company=company, focus=focus)
+
+
+def fill_first_name(text: str, first_name: str) -> str:
+    return text.replace("{first_name}", first_name or "there")
+
+
+def fill_email_draft(text: str, first_name: str, role_line: str) -> str:
+    text = fill_first_name(text, first_name)
+    if "{role_line}" in text:
+        return text.replace("{role_line}", role_line)
+    # The model forgot the placeholder: put the role line after the greeting paragraph
+    head, sep, tail = text.partition("\n\n")
+    return f"{head}{sep}{role_line}\n\n{tail}" if sep else f"{text}\n\n{role_line}"
+
+
+@traced("stage")
+def run_company_email_drafts(
     agent: Agent,
     contacts_data: List[Dict[str, Any]],
     research_data: List[Dict[str, Any]],
@@ -451,86 +992,1105 @@ def run_email_writer(
     sender_company: str,
     calendar_link: Optional[str]
 ) -> List[Dict[str, str]]:
-
+    """Phase one: a single research-driven draft per company, with {first_name}/{role_line} placeholders."""
+    audiences = [
+        {"name": c.get("name", ""), "recipient_roles": [p.get("title", "") for p in c.get("contacts", [])]}
+        for c in contacts_data if c.get("contacts")
+    ]
     prompt = (
-        f"MISSION: Write highly personalized, response-driving outreach emails for each contact below.\n\n"
+        f"MISSION: Write one highly personalized, response-driving outreach email draft per company below.\n\n"
         f"SENDER CONTEXT:\n"
         f"Name: {sender_name}\n"
         f"Company: {sender_company}\n"
         f"Offering: {offering_desc}\n"
         f"Calendar: {calendar_link or 'Request for calendar link in email'}\n\n"
-        f"CONTACTS & RESEARCH:\n{json.dumps(contacts_data, indent=2)}\n\n"
+        f"COMPANIES & RECIPIENT ROLES:\n{json.dumps(audiences, indent=2)}\n\n"
         f"RESEARCH INSIGHTS:\n{json.dumps(research_data, indent=2)}\n\n"
         f"EMAIL REQUIREMENTS:\n"
         f"- Use specific research insights (not generic industry observations)\n"
         f"- Connect insights directly to value proposition\n"
-        f"- Personalize for recipient's role and likely priorities\n"
+        f"- Leave role-specific framing to the {{role_line}} placeholder\n"
         f"- Include compelling subject line\n"
         f"- Clear, specific call-to-action\n\n"
-        f"Each email should feel individually researched and written, not templated.\n\n"
-        f"Return format: {{\"emails\": [{{\"company\": \"Company\", \"contact\": \"Contact Name\", \"subject\": \"Subject\", \"body\": \"Email body\", \"personalization_used\": \"What insight was used\"}}]}}"
+        f"Each draft should feel individually researched and written, not templated.\n\n"
+        f"Return format: {{\"drafts\": [{{\"company\": \"Company\", \"subject\": \"Subject\", \"body\": \"Hi {{first_name}},\\n\\n...{{role_line}}...\", \"personalization_used\": \"What insight was used\"}}]}}"
     )
-    resp = agent.run(prompt)
+    with trace_span("agent.run", "model", agent=agent.session_id):
+        resp = agent.run(prompt)
     data = extract_json_or_raise(str(resp.content))
-    return data.get("emails", [])
+    return data.get("drafts", [])
 
 
-def run_pipeline(
-    target_desc: str,
+def match_drafts_to_companies(drafts: List[Dict[str, str]], company_names: List[str]) -> Dict[str, Dict[str, str]]:
+    """Map each company (lowercase name) to its draft; drafts left over are logged and dropped."""
+    matched, unmatched = match_entries_by_name(drafts, company_names, "company")
+    for draft in unmatched:
+        logger.warning("Email draft for %r matched no company with contacts; skipping it.", draft.get("company", ""))
+    return matched
+
+
+@traced("stage")
+def personalize_email_drafts(
+    drafts: List[Dict[str, str]],
+    contacts_data: List[Dict[str, Any]],
+    personalizer_agent: Optional[Agent] = None,
+    style_key: str = "Professional"
+) -> List[Dict[str, str]]:
+    """Phase two: one email per contact from its company's draft.
+
+    Role lines come from a small model when `personalizer_agent` is given, otherwise from local templates.
+    """
+    drafts_by_company = match_drafts_to_companies(
+        drafts, [c.get("name", "") for c in contacts_data if c.get("contacts")]
+    )
+    recipients = [
+        (company.get("name", ""), contact)
+        for company in contacts_data
+        for contact in company.get("contacts", [])
+        if company.get("name", "").strip().lower() in drafts_by_company
+    ]
+
+    model_lines: Dict[Tuple[str, str], str] = {}
+    if personalizer_agent is not None and recipients:
+        request = {
+            "drafts": {d.get("company", ""): d.get("body", "") for d in drafts},
+            "contacts": [
+                {"company": company, "contact": contact.get("full_name", ""), "title": contact.get("title", "")}
+                for company, contact in recipients
+            ],
+        }
+        prompt = f"Write a role_line for each contact, based on their company's draft.\n\n{json.dumps(request, indent=2)}"
+        try:
+            with trace_span("agent.run", "model", agent=personalizer_agent.session_id):
+                resp = personalizer_agent.run(prompt)
+            for line in extract_json_or_raise(str(resp.content)).get("lines", []):
+                key = (line.get("company", "").strip().lower(), line.get("contact", "").strip().lower())
+                model_lines[key] = line.get("role_line", "")
+        except Exception:
+            model_lines = {}
+
+    emails = []
+    for company, contact in recipients:
+        draft = drafts_by_company[company.strip().lower()]
+        full_name = contact.get("full_name", "")
+        name_parts = person_name_parts(full_name)
+        first_name = name_parts[0] if name_parts else ""
+        role_line = model_lines.get((company.strip().lower(), full_name.strip().lower())) or local_role_line(
+            contact.get("title", ""), company, style_key
+        )
+        emails.append({
+            "company": company,
+            "contact": full_name,
+            "subject": fill_first_name(draft.get("subject", ""), first_name).replace("{role_line}", "").strip(),
+            "body": fill_email_draft(draft.get("body", ""), first_name, role_line),
+            "personalization_used": draft.get("personalization_used", ""),
+        })
+    return emails
+
+
+@traced("stage")
+def run_email_writer(
+    agent: Agent,
+    contacts_data: List[Dict[str, Any]],
+    research_data: List[Dict[str, Any]],
     offering_desc: str,
     sender_name: str,
     sender_company: str,
     calendar_link: Optional[str],
-    num_companies: int,
-    email_style: str
-):
-    """Run the complete outreach pipeline with improved error handling and progress tracking."""
-
-    # Initialize agents
-    company_agent = create_company_finder_agent()
-    contact_agent = create_contact_finder_agent()
-    phone_agent = create_phone_finder_agent()
-    research_agent = create_research_agent()
-    email_agent = create_email_writer_agent(email_style)
+    personalizer_agent: Optional[Agent] = None,
+    style_key: str = "Professional"
+) -> List[Dict[str, str]]:
+    """Write one draft per company, then derive a variant per contact from it."""
+    drafts = run_company_email_drafts(
+        agent, contacts_data, research_data, offering_desc, sender_name, sender_company, calendar_link
+    )
+    return personalize_email_drafts(drafts, contacts_data, personalizer_agent, style_key)
+
+
+# ------------------- Email Pattern Index -------------------
+
+EMAIL_PATTERNS: Dict[str, str] = {
+    "first.last": "{first}.{last}",
+    "firstlast": "{first}{last}",
+    "first_last": "{first}_{last}",
+    "first-last": "{first}-{last}",
+    "f.last": "{f}.{last}",
+    "flast": "{f}{last}",
+    "first.l": "{first}.{l}",
+    "firstl": "{first}{l}",
+    "last.first": "{last}.{first}",
+    "lastf": "{last}{f}",
+    "first": "{first}",
+    "last": "{last}",
+}
+
+FREE_MAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "hotmail.com", "outlook.com", "live.com",
+    "icloud.com", "me.com", "aol.com", "proton.me", "protonmail.com", "gmx.com",
+}
+
+NAME_AFFIXES = {"dr", "mr", "mrs", "ms", "prof", "jr", "sr", "ii", "iii", "iv", "phd", "mba", "md"}
+
+
+@contextmanager
+def locked_file(path: str):
+    """Hold an exclusive lock on `path` (via a sibling .lock file) across threads and processes."""
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class JsonFileStore:
+    """A small JSON document kept in the local cache directory and rewritten atomically.
+
+    Every process and session keeps its own copy, so `save` re-reads the file and merges the
+    entries changed here (see `mark_dirty` / `merge_entry`) into it instead of overwriting it.
+    """
+
+    def __init__(self, filename: str):
+        self.path = cache_path(filename)
+        self._lock = threading.Lock()
+        self.dirty: set = set()
+        self.data: Dict[str, Any] = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def mark_dirty(self, key: str) -> None:
+        self.dirty.add(key)
+
+    def merge_entry(self, on_disk: Optional[Any], ours: Any) -> Any:
+        """Combine an entry changed here with the version another writer saved meanwhile."""
+        return ours
+
+    def save(self) -> None:
+        with self._lock, locked_file(self.path):
+            merged = self._load()
+            for key in self.dirty:
+                if key in self.data:
+                    merged[key] = self.merge_entry(merged.get(key), self.data[key])
+            payload = json.dumps(merged, indent=2)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+            self.data = merged
+            self.dirty = set()
+
+
+def domain_from_url(url: str) -> str:
+    if not url:
+        return ""
+    parsed = urlparse(url if "://" in url else f"https://{url}")
+    host = (parsed.hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def fold_name_part(part: str) -> str:
+    """ASCII-folded, lowercase letters of one name word ("José" -> "jose", "Dr." -> "dr")."""
+    ascii_part = unicodedata.normalize("NFKD", part).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z]", "", ascii_part.lower())
+
+
+def person_name_parts(full_name: str) -> List[str]:
+    """Words of a person's name as written, without titles and suffixes like "Dr." or "PhD"."""
+    words = (full_name or "").replace(",", " ").split()
+    return [w.strip(".") for w in words if fold_name_part(w) and fold_name_part(w) not in NAME_AFFIXES]
+
+
+def split_person_name(full_name: str) -> Tuple[str, str]:
+    """Return ASCII-folded, lowercase (first, last) name parts; last is empty for single names."""
+    parts = [fold_name_part(p) for p in person_name_parts(full_name)]
+    if not parts:
+        return "", ""
+    return parts[0], (parts[-1] if len(parts) > 1 else "")
+
+
+def render_email_pattern(pattern: str, full_name: str) -> Optional[str]:
+    """Build the local part of an address for `full_name`, or None if the name is too short for the pattern."""
+    first, last = split_person_name(full_name)
+    template = EMAIL_PATTERNS[pattern]
+    if not first or (not last and ("{last}" in template or "{l}" in template)):
+        return None
+    return template.format(first=first, last=last, f=first[:1], l=last[:1])
+
+
+def detect_email_pattern(full_name: str, email: str) -> Optional[str]:
+    local_part = (email or "").split("@", 1)[0].lower()
+    if not local_part:
+        return None
+    for pattern in EMAIL_PATTERNS:
+        if render_email_pattern(pattern, full_name) == local_part:
+            return pattern
+    return None
+
+
+class EmailPatternIndex(JsonFileStore):
+    """Per-company-domain email formats learned from distinct verified (non-inferred) addresses.
+
+    A pattern is only used for inference once `min_samples` distinct addresses support it and it
+    accounts for at least `min_agreement` of the domain's samples.
+
+    Layout: {company_domain: {"email_domain": "acme.com", "seen": {"jane.doe@acme.com": "first.last"}}}
+    """
+
+    def __init__(self, filename: str = "email_patterns.json", min_samples: int = 2, min_agreement: float = 0.75):
+        super().__init__(filename)
+        self.min_samples = min_samples
+        self.min_agreement = min_agreement
+
+    def learn(self, company_domain: str, full_name: str, email: str) -> Optional[str]:
+        email = (email or "").strip().lower()
+        email_domain = email.rsplit("@", 1)[-1] if "@" in email else ""
+        if not company_domain or not email_domain or email_domain in FREE_MAIL_DOMAINS:
+            return None
+        pattern = detect_email_pattern(full_name, email)
+        if pattern is None:
+            return None
+        entry = self.data.setdefault(company_domain, {"email_domain": email_domain, "seen": {}})
+        if email in entry["seen"]:
+            return pattern
+        entry["seen"][email] = pattern
+        entry["email_domain"] = email_domain
+        self.mark_dirty(company_domain)
+        return pattern
+
+    def merge_entry(self, on_disk: Optional[Dict[str, Any]], ours: Dict[str, Any]) -> Dict[str, Any]:
+        if not on_disk:
+            return ours
+        return {**ours, "seen": {**on_disk.get("seen", {}), **ours["seen"]}}
+
+    def pattern_for(self, company_domain: str) -> Optional[Tuple[str, str]]:
+        """Dominant (pattern, email_domain) for a company domain, if enough distinct addresses agree on it."""
+        entry = self.data.get(company_domain)
+        if not entry or not entry.get("seen"):
+            return None
+        patterns = Counter(entry["seen"].values())
+        pattern, count = patterns.most_common(1)[0]
+        if count < self.min_samples or count / sum(patterns.values()) < self.min_agreement:
+            return None
+        return pattern, entry["email_domain"]
+
+    def infer(self, company_domain: str, full_name: str) -> Optional[Tuple[str, str]]:
+        """Return (email, pattern) for a contact using the known domain pattern, if any."""
+        known = self.pattern_for(company_domain)
+        if known is None:
+            return None
+        pattern, email_domain = known
+        local_part = render_email_pattern(pattern, full_name)
+        if local_part is None:
+            return None
+        return f"{local_part}@{email_domain}", pattern
+
+    def known_formats(self, companies: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Company name -> example format (e.g. 'first.last@acme.com') for companies with a known pattern."""
+        formats = {}
+        for company in companies:
+            known = self.pattern_for(domain_from_url(company.get("website", "")))
+            if known:
+                formats[company.get("name", "")] = f"{known[0]}@{known[1]}"
+        return formats
+
+
+@traced("local")
+def apply_email_patterns(
+    contacts: List[Dict[str, Any]],
+    companies: List[Dict[str, Any]],
+    index: EmailPatternIndex
+) -> List[Dict[str, Any]]:
+    """Learn patterns from verified emails, then fill missing/inferred emails locally from the index."""
+    websites = {c.get("name", "").strip().lower(): c.get("website", "") for c in companies}
+
+    for company_data in contacts:
+        domain = domain_from_url(websites.get(company_data.get("name", "").strip().lower(), ""))
+        for contact in company_data.get("contacts", []):
+            if contact.get("email") and not contact.get("inferred"):
+                index.learn(domain, contact.get("full_name", ""), contact["email"])
+
+    for company_data in contacts:
+        domain = domain_from_url(websites.get(company_data.get("name", "").strip().lower(), ""))
+        for contact in company_data.get("contacts", []):
+            if contact.get("email") and not contact.get("inferred"):
+                continue
+            inferred = index.infer(domain, contact.get("full_name", ""))
+            if inferred:
+                contact["email"], pattern = inferred
+                contact["inferred"] = True
+                contact["source"] = f"email pattern index ({pattern})"
+
+    index.save()
+    return contacts
+
+
+# ------------------- Phone Normalization -------------------
+
+PHONE_TYPE_ALIASES = {
+    "direct": "direct", "direct dial": "direct", "desk": "direct", "dd": "direct",
+    "mobile": "mobile", "cell": "mobile", "cellular": "mobile",
+    "office": "office", "office extension": "office", "extension": "office",
+    "main": "main", "general": "main", "headquarters": "main", "hq": "main", "switchboard": "main",
+}
+
+PHONE_EXTENSION_RE = r"\s*(?:ext\.?|extension|x|#)\s*(\d{1,6})\s*$"
+
+
+@traced("local")
+def normalize_phone_results(phones: List[Dict[str, Any]], default_country_code: str = "1") -> List[Dict[str, Any]]:
+    """Parse, normalize to E.164, validate and de-duplicate phone finder output in one vectorized pass.
+
+    Numbers without an international prefix are assumed to be national numbers in `default_country_code`.
+    A leading trunk "0" is stripped for non-NANP defaults; with the NANP default ("1") it means the
+    number belongs to some other, unknown country, so it is dropped. Invalid numbers are dropped;
+    companies left without numbers are omitted.
+    """
+    rows = [
+        {**contact, "_company": company.get("name") or "", "_company_idx": i}
+        for i, company in enumerate(phones)
+        for contact in company.get("contacts", [])
+        if isinstance(contact, dict)
+    ]
+    if not rows:
+        return []
+
+    df = pd.DataFrame(rows)
+    for col in ("full_name", "phone_number", "phone_type", "verified", "source"):
+        if col not in df.columns:
+            df[col] = None
+
+    raw = df["phone_number"].fillna("").astype(str).str.strip()
+    extension = raw.str.extract(PHONE_EXTENSION_RE, flags=re.IGNORECASE)[0]
+    number = raw.str.replace(PHONE_EXTENSION_RE, "", regex=True, flags=re.IGNORECASE)
+
+    has_plus = number.str.match(r"^\s*\+")
+    has_idd = ~has_plus & number.str.match(r"^\s*00")
+    # "+49 (0)30 ..." style: the bracketed trunk digit is not dialled after a country code
+    international = has_plus | has_idd
+    number = number.where(~international, number.str.replace(r"\(\s*0\s*\)", "", regex=True))
+    digits = number.str.replace(r"\D", "", regex=True)
+    national = (~international).to_numpy()
+    trunk_prefixed = ~international & digits.str.startswith("0")
+    national_digits = digits.str.replace(r"^0", "", regex=True)
+    # A national number that already carries the default country code (e.g. "1 415 555 0100")
+    with_country_code = national_digits.str.startswith(default_country_code) & (
+        national_digits.str.len() == 10 + len(default_country_code)
+    )
+    e164_digits = digits.where(~has_idd, digits.str[2:])
+    e164_digits = e164_digits.where(~national, national_digits.where(with_country_code, default_country_code + national_digits))
+
+    valid = e164_digits.str.match(r"^[1-9]\d{7,14}$")
+    if default_country_code == "1":
+        valid &= ~trunk_prefixed
+    # North American numbering plan: NXX area code + NXX exchange, no N11 codes, no 555-01XX fictional range
+    nanp = e164_digits.str.startswith("1")
+    valid &= ~nanp | (
+        e164_digits.str.match(r"^1[2-9]\d{2}[2-9]\d{6}$")
+        & ~e164_digits.str.match(r"^1[2-9]11")
+        & ~e164_digits.str.match(r"^1\d{3}55501\d{2}$")
+    )
+    # Placeholder numbers such as 0000000000 (no backreferences: pyarrow regexes don't support them)
+    valid &= ~e164_digits.map(lambda d: len(set(d)) <= 1).astype(bool)
 
-    results = {"companies": [], "contacts": [], "phones": [], "research": [], "emails": []}
+    df["phone_number"] = "+" + e164_digits
+    df["extension"] = extension
+    df["phone_type"] = (
+        df["phone_type"].fillna("").astype(str).str.strip().str.lower().map(PHONE_TYPE_ALIASES).fillna("unknown")
+    )
+    df["verified"] = df["verified"].astype(str).str.strip().str.lower().isin(["true", "1", "yes"])
+
+    df = df[valid]
+    df = df.sort_values(["_company_idx", "verified"], ascending=[True, False], kind="stable")
+    df = df.drop_duplicates(subset=["_company_idx", "full_name", "phone_number", "extension"])
+    df = df.astype(object).where(df.notna(), None)
+
+    normalized: List[Dict[str, Any]] = []
+    for (_, company_name), group in df.groupby(["_company_idx", "_company"], sort=True, dropna=False):
+        contacts = group.drop(columns=["_company", "_company_idx"]).to_dict(orient="records")
+        for contact in contacts:
+            if contact.get("extension") is None:
+                contact.pop("extension")
+        normalized.append({"name": company_name, "contacts": contacts})
+    return normalized
+
+
+# ------------------- Research Store -------------------
+
+class ResearchStore(JsonFileStore):
+    """Per-company research insights with source URLs and timestamps.
+
+    Freshness is based on age alone: the company finder's wording changes on every run, so it is
+    not a usable change signal. Layout: {company_key: {"name", "insights", "sources", "researched_at"}}
+    """
+
+    def __init__(self, filename: str = "research_store.json"):
+        super().__init__(filename)
+
+    @staticmethod
+    def key_for(company: Dict[str, Any]) -> str:
+        return domain_from_url(company.get("website", "")) or company.get("name", "").strip().lower()
+
+    def is_fresh(self, company: Dict[str, Any], max_age_days: float, now: Optional[float] = None) -> bool:
+        record = self.data.get(self.key_for(company))
+        if not record or max_age_days <= 0:
+            return False
+        age_days = ((now or time.time()) - record.get("researched_at", 0)) / 86400
+        return age_days <= max_age_days
+
+    def get(self, company: Dict[str, Any]) -> Dict[str, Any]:
+        record = self.data[self.key_for(company)]
+        return {
+            "name": company.get("name", record.get("name", "")),
+            "insights": record.get("insights", []),
+            "sources": record.get("sources", []),
+            "researched_at": record.get("researched_at"),
+            "cached": True,
+        }
+
+    def merge_entry(self, on_disk: Optional[Dict[str, Any]], ours: Dict[str, Any]) -> Dict[str, Any]:
+        # Keep whichever research is newer
+        if on_disk and on_disk.get("researched_at", 0) > ours.get("researched_at", 0):
+            return on_disk
+        return ours
+
+    def put(self, company: Dict[str, Any], research: Dict[str, Any], now: Optional[float] = None) -> None:
+        key = self.key_for(company)
+        with self._lock:
+            self.mark_dirty(key)
+            self.data[key] = {
+                "name": company.get("name", ""),
+                "insights": research.get("insights", []),
+                "sources": research.get("sources", []),
+                "researched_at": now or time.time(),
+            }
+
+
+@traced("stage")
+def run_research_incremental(
+    agent: Agent,
+    companies: List[Dict[str, Any]],
+    store: ResearchStore,
+    max_age_days: float
+) -> List[Dict[str, Any]]:
+    """Research only companies whose stored insights are missing or older than max_age_days."""
+    stale = [c for c in companies if not store.is_fresh(c, max_age_days)]
+    fresh_by_name: Dict[str, Dict[str, Any]] = {}
+    if stale:
+        fresh_by_name, _ = match_entries_by_name(run_research(agent, stale), [c.get("name", "") for c in stale])
+        for company in stale:
+            entry = fresh_by_name.get(company.get("name", "").strip().lower())
+            if entry and entry.get("insights"):
+                store.put(company, entry)
+        store.save()
+
+    research = []
+    for company in companies:
+        entry = fresh_by_name.get(company.get("name", "").strip().lower())
+        if entry is not None:
+            # Keep the requested spelling so later stages can look the company up by name
+            research.append({**entry, "name": company.get("name", "")})
+        elif store.is_fresh(company, max_age_days):
+            research.append(store.get(company))
+    return research
+
+
+# ------------------- Execution Planner -------------------
+
+# Rough per-company cost of each stage: (model, tokens, seconds). Used for planning before real usage is known.
+STAGE_ESTIMATES: Dict[str, Tuple[str, int, float]] = {
+    "companies": ("gpt-5", 8000, 60),
+    "contacts": ("gpt-4o", 6000, 25),
+    "research": ("gpt-5", 8000, 40),
+    "phones": ("gpt-4o", 5000, 25),
+    "emails": ("gpt-5", 3000, 20),
+    "personalize": ("gpt-4o-mini", 1500, 8),
+}
+CORE_STAGES = ("contacts", "research", "emails")
+SPECULATIVE_STAGES = ("contacts", "research")
+# Companies scoring below this are not started while the finder streams; planning may still pick them up.
+MIN_DISPATCH_SCORE = 1.5
+
+# Blended input/output USD price per 1M tokens; adjust to your OpenAI pricing.
+MODEL_PRICE_PER_1M_TOKENS = {"gpt-5": 4.0, "gpt-4o": 5.0, "gpt-4o-mini": 0.3}
+
+
+class BatchBudget:
+    """Token/time budget shared by every row of a batch, plus the throughput counters judged against it."""
+
+    def __init__(self, max_tokens: int = 0, max_minutes: float = 0):
+        self.max_tokens = max_tokens
+        self.max_seconds = max_minutes * 60
+        self.started_at = time.time()
+        self.tokens_used = 0
+        self.reserved_tokens = 0
+        self.cost_usd = 0.0
+        self.emails = 0
+        self.qualified_emails = 0
+        self._lock = threading.Lock()
+
+    def _fits(self, tokens: int, seconds: float) -> bool:
+        if self.max_tokens and self.tokens_used + self.reserved_tokens + tokens > self.max_tokens:
+            return False
+        if self.max_seconds and time.time() - self.started_at + seconds > self.max_seconds:
+            return False
+        return True
+
+    def can_afford(self, stages: Tuple[str, ...], reserved_tokens: int = 0, reserved_seconds: float = 0) -> bool:
+        tokens = reserved_tokens + sum(STAGE_ESTIMATES[s][1] for s in stages)
+        seconds = reserved_seconds + max((STAGE_ESTIMATES[s][2] for s in stages), default=0)
+        with self._lock:
+            return self._fits(tokens, seconds)
+
+    def reserve(self, stages: Tuple[str, ...]) -> bool:
+        """Atomically check and hold the stages' estimated tokens until each stage is released."""
+        tokens = sum(STAGE_ESTIMATES[s][1] for s in stages)
+        seconds = max((STAGE_ESTIMATES[s][2] for s in stages), default=0)
+        with self._lock:
+            if not self._fits(tokens, seconds):
+                return False
+            self.reserved_tokens += tokens
+        return True
+
+    def release(self, stage: str) -> None:
+        with self._lock:
+            self.reserved_tokens = max(0, self.reserved_tokens - STAGE_ESTIMATES[stage][1])
+
+    def charge(self, model: str, tokens: int) -> None:
+        with self._lock:
+            self.tokens_used += tokens
+            self.cost_usd += tokens / 1_000_000 * MODEL_PRICE_PER_1M_TOKENS.get(model, 5.0)
+
+    def charge_agent(self, agent: Agent, stage: str) -> None:
+        """Charge the agent's last run, falling back to the stage estimate when metrics are unavailable."""
+        model, estimate, _ = STAGE_ESTIMATES[stage]
+        metrics = getattr(getattr(agent, "run_response", None), "metrics", None) or {}
+        total = metrics.get("total_tokens", 0)
+        tokens = sum(total) if isinstance(total, list) else int(total or 0)
+        self.charge(model, tokens or estimate)
+
+    def record_emails(self, emails: int, qualified: int) -> None:
+        with self._lock:
+            self.emails += emails
+            self.qualified_emails += qualified
+
+    def summary(self) -> Dict[str, float]:
+        minutes = max((time.time() - self.started_at) / 60, 1e-9)
+        return {
+            "tokens_used": self.tokens_used,
+            "cost_usd": round(self.cost_usd, 4),
+            "minutes": round(minutes, 2),
+            "emails": self.emails,
+            "qualified_emails": self.qualified_emails,
+            "qualified_per_dollar": round(self.qualified_emails / self.cost_usd, 2) if self.cost_usd else 0.0,
+            "qualified_per_minute": round(self.qualified_emails / minutes, 2),
+        }
+
+
+def score_company(company: Dict[str, Any]) -> float:
+    """Heuristic fit score from the company finder's own output: why_fit specificity, growth signals, size."""
+    why_fit = str(company.get("why_fit", ""))
+    score = min(len(why_fit.split()) / 40, 1.0) * 2
+    if re.search(r"\d", why_fit):
+        score += 0.5
+    signals = company.get("growth_signals") or []
+    if isinstance(signals, str):
+        signals = [signals]
+    score += min(len(signals), 5) * 0.6
+    sizes = [int(n) for n in re.findall(r"\d+", str(company.get("employee_count", "")).replace(",", ""))]
+    if sizes and 50 <= max(sizes) and min(sizes) <= 5000:
+        score += 1.0
+    return round(score, 2)
+
+
+def plan_companies(
+    companies: List[Dict[str, Any]],
+    budget: BatchBudget,
+    phone_top_k: int,
+    started: Optional[set] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Rank companies by score and assign each a tier: 'full' (incl. phones), 'core' or 'deferred'.
+
+    Companies in `started` (lowercase names whose contacts/research were reserved at dispatch)
+    only need the email stage budgeted; their other stages are already held in `budget`. Returns {company name (lowercase): {"score", "rank", "tier"}}.
+    """
+    ranked = sorted(companies, key=score_company, reverse=True)
+    plan: Dict[str, Dict[str, Any]] = {}
+    reserved_tokens = 0
+    for rank, company in enumerate(ranked, 1):
+        key = company.get("name", "").strip().lower()
+        stages = ("emails",) if key in (started or set()) else CORE_STAGES
+        tier = "deferred"
+        if budget.can_afford(stages, reserved_tokens):
+            tier = "core"
+            reserved_tokens += sum(STAGE_ESTIMATES[s][1] for s in stages)
+            if rank <= phone_top_k and budget.can_afford(("phones",), reserved_tokens):
+                tier = "full"
+                reserved_tokens += STAGE_ESTIMATES["phones"][1]
+        plan[key] = {"score": score_company(company), "rank": rank, "tier": tier}
+    return plan
+
+
+def count_qualified_emails(emails: List[Dict[str, Any]], contacts: List[Dict[str, Any]]) -> int:
+    """Emails addressed to a contact we actually have an email address for."""
+    reachable = {
+        (company.get("name", "").strip().lower(), contact.get("full_name", "").strip().lower())
+        for company in contacts
+        for contact in company.get("contacts", [])
+        if "@" in (contact.get("email") or "")
+    }
+    return sum(
+        (e.get("company", "").strip().lower(), e.get("contact", "").strip().lower()) in reachable for e in emails
+    )
 
-    # Step 1: Companies
-    companies = run_company_finder(company_agent, target_desc, offering_desc, num_companies)
-    results["companies"] = companies
 
-    if not companies:
-        return results
+# ------------------- Speculative Dispatch -------------------
+
+class SpeculativeCompanyDispatcher:
+    """Starts contact finding and research for each company while the company finder is still streaming.
+
+    Every company gets its own agents so the per-company runs can proceed in parallel. Only companies
+    scoring at least `min_score` are started, and each start reserves its estimated tokens in the budget
+    so concurrent dispatches cannot overshoot it. Work for companies missing from the final company list
+    is cancelled (or its result discarded if already running).
+    """
+
+    def __init__(
+        self,
+        executor: ThreadPoolExecutor,
+        target_desc: str,
+        offering_desc: str,
+        email_index: "EmailPatternIndex",
+        research_store: "ResearchStore",
+        research_max_age_days: float,
+        budget: BatchBudget,
+        memory_partition: str = "default",
+        min_score: float = MIN_DISPATCH_SCORE
+    ):
+        self.executor = executor
+        self.target_desc = target_desc
+        self.offering_desc = offering_desc
+        self.email_index = email_index
+        self.research_store = research_store
+        self.research_max_age_days = research_max_age_days
+        self.budget = budget
+        self.memory_partition = memory_partition
+        self.min_score = min_score
+        self.futures: Dict[str, Tuple[Future, Future]] = {}
+        self.reserved: set = set()
+
+    @staticmethod
+    def key_for(company: Dict[str, Any]) -> str:
+        return company.get("name", "").strip().lower()
+
+    def _find_contacts(self, company: Dict[str, Any], reserved: bool) -> List[Dict[str, Any]]:
+        agent = create_contact_finder_agent(self.memory_partition)
+        try:
+            contacts = run_contact_finder(
+                agent, [company], self.target_desc, self.offering_desc, self.email_index.known_formats([company])
+            )
+            self.budget.charge_agent(agent, "contacts")
+            # Later stages look companies up by the finder's name, not the contact finder's spelling
+            return [{**entry, "name": company.get("name", "")} for entry in contacts]
+        finally:
+            if reserved:
+                self.budget.release("contacts")
+
+    def _research(self, company: Dict[str, Any], reserved: bool) -> List[Dict[str, Any]]:
+        agent = create_research_agent(self.memory_partition)
+        try:
+            research = run_research_incremental(agent, [company], self.research_store, self.research_max_age_days)
+            if getattr(agent, "run_response", None) is not None:
+                self.budget.charge_agent(agent, "research")
+            return research
+        finally:
+            if reserved:
+                self.budget.release("research")
+
+    def dispatch(self, company: Dict[str, Any]) -> None:
+        """Start work for a promising company unless it is already running or the budget cannot hold it."""
+        key = self.key_for(company)
+        if key in self.futures or score_company(company) < self.min_score:
+            return
+        if not self.budget.reserve(SPECULATIVE_STAGES):
+            return
+        self.reserved.add(key)
+        self._submit(company, reserved=True)
+
+    def _submit(self, company: Dict[str, Any], reserved: bool = False) -> None:
+        self.futures[self.key_for(company)] = (
+            submit_in_context(self.executor, self._find_contacts, company, reserved),
+            submit_in_context(self.executor, self._research, company, reserved),
+        )
 
-    # Step 2: Contacts
-    contacts = run_contact_finder(contact_agent, companies, target_desc, offering_desc)
+    def _cancel(self, key: str) -> None:
+        for stage, future in zip(SPECULATIVE_STAGES, self.futures[key]):
+            if future.cancel() and key in self.reserved:
+                self.budget.release(stage)
+
+    def collect(self, companies: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return (contacts, research) for the final company list, in its order."""
+        final_keys = {self.key_for(c) for c in companies}
+        for key in self.futures:
+            if key not in final_keys:
+                self._cancel(key)
+        for company in companies:
+            if self.key_for(company) not in self.futures:
+                self._submit(company)
+
+        contacts: List[Dict[str, Any]] = []
+        research: List[Dict[str, Any]] = []
+        for company in companies:
+            contact_future, research_future = self.futures[self.key_for(company)]
+            contacts.extend(contact_future.result())
+            research.extend(research_future.result())
+        return contacts, research
+
+    def cancel_all(self) -> None:
+        for key in self.futures:
+            self._cancel(key)
+
+
+@traced("pipeline")
+def run_pipeline(
+    target_desc: str,
+    offering_desc: str,
+    sender_name: str,
+    sender_company: str,
+    calendar_link: Optional[str],
+    num_companies: int,
+    email_style: str,
+    research_max_age_days: float = 14,
+    budget: Optional[BatchBudget] = None,
+    phone_top_k: int = 2,
+    memory_partition: str = "default",
+    personalize_with_model: bool = False
+):
+    """Run the complete outreach pipeline with improved error handling and progress tracking.
+
+    Companies are scored and planned against `budget` (shared across a batch): only the top
+    `phone_top_k` get the phone stage, and companies the budget cannot cover are deferred.
+    """
+    budget = budget or BatchBudget()
+
+    # Initialize agents (contact and research agents are created per company by the dispatcher)
+    company_agent = create_company_finder_agent(memory_partition)
+    phone_agent = create_phone_finder_agent(memory_partition)
+    email_agent = create_email_writer_agent(email_style, memory_partition)
+    personalizer_agent = create_email_personalizer_agent(email_style, memory_partition) if personalize_with_model else None
+
+    results = {"companies": [], "plan": [], "contacts": [], "phones": [], "research": [], "emails": []}
+
+    email_index = EmailPatternIndex()
+    executor = ThreadPoolExecutor(max_workers=min(8, 2 * max(1, num_companies)), thread_name_prefix="gtm-company")
+    dispatcher = SpeculativeCompanyDispatcher(
+        executor, target_desc, offering_desc, email_index, ResearchStore(), research_max_age_days, budget,
+        memory_partition
+    )
+    try:
+        # Step 1: Companies (contacts and research start as each company streams in)
+        companies = run_company_finder_streaming(
+            company_agent, target_desc, offering_desc, num_companies, dispatcher.dispatch
+        )
+        budget.charge_agent(company_agent, "companies")
+        results["companies"] = companies
+
+        if not companies:
+            dispatcher.cancel_all()
+            return results
+
+        # Rank companies and decide which stages each one gets within the budget
+        plan = plan_companies(companies, budget, phone_top_k, started=dispatcher.reserved)
+        results["plan"] = [{"name": c.get("name", ""), **plan[c.get("name", "").strip().lower()]} for c in companies]
+        planned = [c for c in companies if plan[c.get("name", "").strip().lower()]["tier"] != "deferred"]
+
+        # Steps 2 & 4: Contacts and research (reuses stored insights younger than research_max_age_days)
+        contacts, research = dispatcher.collect(planned)
+    finally:
+        dispatcher.cancel_all()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    # Emails for domains with a known pattern are filled locally
+    contacts = apply_email_patterns(contacts, companies, email_index)
     results["contacts"] = contacts
 
     if not contacts:
         return results
 
-    # Step 3: Phone numbers (best-effort)
-    try:
-        phones = run_phone_finder(phone_agent, contacts)
-    except Exception:
-        phones = []
+    # Step 3: Phone numbers (best-effort, top-ranked companies only)
+    phone_contacts = [c for c in contacts if plan.get(c.get("name", "").strip().lower(), {}).get("tier") == "full"]
+    phones = []
+    if phone_contacts:
+        try:
+            raw_phones = run_phone_finder(phone_agent, phone_contacts)
+            budget.charge_agent(phone_agent, "phones")
+        except Exception:
+            raw_phones = []
+        phones = normalize_phone_results(raw_phones)
     results["phones"] = phones
 
-    # Step 4: Research
-    research = run_research(research_agent, companies)
+    # Step 4: Research (gathered alongside contacts above)
     results["research"] = research
 
-    # Step 5: Emails
+    # Step 5: Emails (one draft per company, then a cheap variant per contact)
     emails = run_email_writer(
-        email_agent, contacts, research, offering_desc, sender_name, sender_company, calendar_link
+        email_agent, contacts, research, offering_desc, sender_name, sender_company, calendar_link,
+        personalizer_agent, email_style
     )
+    budget.charge_agent(email_agent, "emails")
+    if personalizer_agent is not None:
+        budget.charge_agent(personalizer_agent, "personalize")
+    budget.record_emails(len(emails), count_qualified_emails(emails, contacts))
     results["emails"] = emails
 
     return results
 
 
+# ------------------- Near-Duplicate Rows -------------------
+
+# Filler words that never change who a row targets; any other differing word keeps rows apart
+ROW_STOPWORDS = frozenset({
+    "a", "an", "and", "or", "the", "of", "in", "for", "with", "to", "on", "at", "by", "from",
+    "that", "are", "is", "based", "company", "companies", "firm", "firms",
+})
+
+
+def row_tokens(row_text: str) -> frozenset:
+    """Case-, accent-, punctuation- and column-order-insensitive token set of a row, without stopwords."""
+    ascii_text = unicodedata.normalize("NFKD", row_text or "").encode("ascii", "ignore").decode()
+    return frozenset(re.findall(r"[a-z0-9]+", ascii_text.lower())) - ROW_STOPWORDS
+
+
+def cluster_duplicate_rows(row_texts: List[str]) -> List[List[int]]:
+    """Group row positions whose texts differ only in case, column order, punctuation, repeats or stopwords.
+
+    Rows are bucketed on their token set, so this is linear in the number of rows. Clusters (and
+    the rows within them) keep upload order.
+    """
+    clusters: Dict[frozenset, List[int]] = {}
+    for position, text in enumerate(row_texts):
+        clusters.setdefault(row_tokens(text), []).append(position)
+    return list(clusters.values())
+
+
+# ------------------- Result Store -------------------
+
+class EmailRecord:
+    """One generated email; company/contact strings are interned so repeated keys share one object."""
+
+    __slots__ = ("company", "contact", "subject", "body", "personalization")
+
+    def __init__(self, company: str, contact: str, subject: str, body: str, personalization: str):
+        self.company = sys.intern(company)
+        self.contact = sys.intern(contact)
+        self.subject = subject
+        self.body = body
+        self.personalization = personalization
+
+    @classmethod
+    def from_dict(cls, email: Dict[str, Any]) -> "EmailRecord":
+        return cls(
+            str(email.get("company", "")), str(email.get("contact", "")), str(email.get("subject", "")),
+            str(email.get("body", "")), str(email.get("personalization_used", ""))
+        )
+
+
+class RunRecord:
+    """A pipeline result, either held in memory or spilled to disk at (offset, length)."""
+
+    __slots__ = ("result", "emails", "email_count", "nbytes", "spill_offset", "spill_length")
+
+    def __init__(self, result: Dict[str, Any], nbytes: int):
+        self.result: Optional[Dict[str, Any]] = result
+        self.emails: Optional[Tuple[EmailRecord, ...]] = tuple(EmailRecord.from_dict(e) for e in result.get("emails", []))
+        self.email_count = len(self.emails)
+        self.nbytes = nbytes
+        self.spill_offset = -1
+        self.spill_length = 0
+
+
+class RowRecord:
+    """One uploaded row, pointing at the shared run that produced its results (or carrying an error)."""
+
+    __slots__ = ("row", "target_desc", "run_id", "error", "shared_with_row")
+
+    def __init__(self, row: int, target_desc: str, run_id: int = -1, error: Optional[str] = None,
+                 shared_with_row: Optional[int] = None):
+        self.row = row
+        self.target_desc = target_desc
+        self.run_id = run_id
+        self.error = error
+        self.shared_with_row = shared_with_row
+
+
+class ResultStore:
+    """Single store of batch results shared by the UI and the exporters.
+
+    Near-duplicate rows reference the same run instead of copying it. Once in-memory results exceed
+    `spill_threshold_mb`, the oldest completed runs are written to a temporary file in the cache
+    directory and read back only when displayed or exported.
+    """
+
+    CSV_COLUMNS = ["Row", "Company", "Contact", "Subject", "Body", "Personalization"]
+
+    def __init__(self, spill_threshold_mb: float = 64):
+        self.spill_threshold = int(spill_threshold_mb * 1024 * 1024)
+        self.rows: List[RowRecord] = []
+        self.runs: List[RunRecord] = []
+        self.memory_bytes = 0
+        self._next_to_spill = 0
+        self._spill_file = None
+        self._lock = threading.Lock()
+
+    def add_run(self, result: Dict[str, Any]) -> int:
+        payload = json.dumps(result)
+        with self._lock:
+            self.runs.append(RunRecord(result, len(payload)))
+            self.memory_bytes += len(payload)
+            while self.memory_bytes > self.spill_threshold and self._next_to_spill < len(self.runs):
+                self._spill(self.runs[self._next_to_spill])
+                self._next_to_spill += 1
+            return len(self.runs) - 1
+
+    def add_row(self, row: int, target_desc: str, run_id: int = -1, error: Optional[str] = None,
+                shared_with_row: Optional[int] = None) -> None:
+        with self._lock:
+            self.rows.append(RowRecord(row, target_desc, run_id, error, shared_with_row))
+
+    def _spill(self, record: RunRecord) -> None:
+        if record.result is None:
+            return
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(dir=os.path.dirname(cache_path("results.spill")), suffix=".spill")
+        data = json.dumps(record.result).encode("utf-8")
+        self._spill_file.seek(0, os.SEEK_END)
+        record.spill_offset = self._spill_file.tell()
+        record.spill_length = len(data)
+        self._spill_file.write(data)
+        record.result = None
+        record.emails = None
+        self.memory_bytes -= record.nbytes
+
+    def get_result(self, run_id: int) -> Dict[str, Any]:
+        record = self.runs[run_id]
+        if record.result is not None:
+            return record.result
+        with self._lock:
+            self._spill_file.seek(record.spill_offset)
+            return json.loads(self._spill_file.read(record.spill_length).decode("utf-8"))
+
+    def get_emails(self, run_id: int) -> Tuple[EmailRecord, ...]:
+        record = self.runs[run_id]
+        if record.emails is not None:
+            return record.emails
+        return tuple(EmailRecord.from_dict(e) for e in self.get_result(run_id).get("emails", []))
+
+    def email_count(self, run_id: int) -> int:
+        return self.runs[run_id].email_count
+
+    def sorted_rows(self) -> List[RowRecord]:
+        return sorted(self.rows, key=lambda r: r.row)
+
+    def write_json(self, path: str) -> str:
+        """Stream all rows (same layout as the in-memory export used to have) to `path`."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[")
+            for i, rec in enumerate(self.sorted_rows()):
+                item: Dict[str, Any] = {"row": rec.row, "target_desc": rec.target_desc}
+                if rec.error is not None:
+                    item["error"] = rec.error
+                else:
+                    item["result"] = self.get_result(rec.run_id)
+                    if rec.shared_with_row is not None:
+                        item["shared_with_row"] = rec.shared_with_row
+                f.write(("," if i else "") + "\n" + json.dumps(item, indent=2))
+            f.write("\n]")
+        return path
+
+    def write_csv(self, path: str) -> int:
+        """Stream every email (one line per row it applies to) to `path`; returns the number written."""
+        written = 0
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(self.CSV_COLUMNS)
+            for rec in self.sorted_rows():
+                if rec.error is not None:
+                    continue
+                for email in self.get_emails(rec.run_id):
+                    writer.writerow([rec.row, email.company, email.contact, email.subject, email.body, email.personalization])
+                    written += 1
+        return written
+
+
+def benchmark_result_store(num_rows: int = 10_000, emails_per_row: int = 6, spill_threshold_mb: float = 16) -> Dict[str, float]:
+    """Peak traced memory (MB) of the old dict-list bookkeeping vs ResultStore for a synthetic batch.
+
+    Both sides include the exports as the download buttons hold them: the old JSON/CSV strings, and
+    the store's JSON/CSV files read back into memory.
+    """
+    def fake_result(i: int) -> Dict[str, Any]:
+        company = f"Company {i % 500}"
+        return {
+            "companies": [{"name": company, "website": f"https://company{i % 500}.com", "why_fit": "x" * 200}],
+            "contacts": [{"name": company, "contacts": [{"full_name": f"Person {j}", "email": f"p{j}@c.com"} for j in range(emails_per_row)]}],
+            "phones": [],
+            "research": [{"name": company, "insights": ["y" * 150] * 4}],
+            "emails": [
+                {"company": company, "contact": f"Person {j}", "subject": f"Quick question {i}-{j}",
+                 "body": f"Hi Person {j},\n\n" + "z" * 900 + f" {i}", "personalization_used": "funding"}
+                for j in range(emails_per_row)
+            ],
+        }
+
+    # Baseline: results list + flattened CSV dicts + JSON/CSV export strings, as the batch loop used to keep them
+    tracemalloc.start()
+    all_results, combined = [], []
+    for i in range(num_rows):
+        result = fake_result(i)
+        all_results.append({"row": i + 1, "target_desc": f"row {i}", "result": result})
+        for e in result["emails"]:
+            combined.append({"Row": i + 1, "Company": e["company"], "Contact": e["contact"], "Subject": e["subject"],
+                             "Body": e["body"], "Personalization": e["personalization_used"]})
+    exported = json.dumps(all_results, indent=2)
+    exported_csv = pd.DataFrame(combined).to_csv(index=False)
+    baseline_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del all_results, combined, exported, exported_csv
+
+    tracemalloc.start()
+    store = ResultStore(spill_threshold_mb)
+    for i in range(num_rows):
+        store.add_row(i + 1, f"row {i}", store.add_run(fake_result(i)))
+    with tempfile.TemporaryDirectory(prefix="gtm-export-") as export_dir:
+        json_path = store.write_json(os.path.join(export_dir, "benchmark.json"))
+        csv_path = os.path.join(export_dir, "benchmark.csv")
+        store.write_csv(csv_path)
+        downloads = []
+        for path in (json_path, csv_path):
+            with open(path, "rb") as f:
+                downloads.append(f.read())
+        store_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del downloads
+
+    return {
+        "rows": num_rows,
+        "baseline_peak_mb": round(baseline_peak / 2**20, 1),
+        "result_store_peak_mb": round(store_peak / 2**20, 1),
+        "result_store_resident_mb": round(store.memory_bytes / 2**20, 1),
+    }
+
+
 # ------------------- UI Helpers (rendering) -------------------
 
+@traced("render")
 def render_results_tabs(results: Dict[str, Any]) -> None:
     companies = results.get("companies", [])
     contacts = results.get("contacts", [])
@@ -553,11 +2113,17 @@ def render_results_tabs(results: Dict[str, Any]) -> None:
 
     tab1, tab2, tab3, tab4, tab5 = st.tabs(["🏢 Companies", "👥 Contacts", "📞 Phone Numbers", "🔬 Research", "✉️ Emails"])
 
+    plan = {p.get('name', '').strip().lower(): p for p in results.get("plan", [])}
+    tier_labels = {"full": "🟢 full (incl. phones)", "core": "🟡 core", "deferred": "⚪ deferred (over budget)"}
+
     with tab1:
         st.subheader("Target Companies Found")
         if companies:
             for idx, company in enumerate(companies, 1):
                 with st.expander(f"{idx}. {company.get('name', 'Unknown Company')}", expanded=False):
+                    priority = plan.get(company.get('name', '').strip().lower())
+                    if priority:
+                        st.write(f"**Priority:** #{priority['rank']} · score {priority['score']} · {tier_labels.get(priority['tier'], priority['tier'])}")
                     st.write(f"**Website:** {company.get('website', 'N/A')}")
                     st.write(f"**Employee Count:** {company.get('employee_count', 'Unknown')}")
                     st.write(f"**Why it's a fit:** {company.get('why_fit', 'N/A')}")
@@ -608,6 +2174,8 @@ def render_results_tabs(results: Dict[str, Any]) -> None:
                             st.write(f"**{contact.get('full_name', 'Unknown')}**")
                         with c2:
                             phone = contact.get('phone_number', 'Not found')
+                            if contact.get('extension'):
+                                phone = f"{phone} ext. {contact['extension']}"
                             phone_type = contact.get('phone_type', 'unknown')
                             verified_badge = " ✅" if contact.get('verified') else " ~"
                             st.write(f"📞 {phone} ({phone_type}){verified_badge}")
@@ -626,8 +2194,14 @@ def render_results_tabs(results: Dict[str, Any]) -> None:
                 insights = company_research.get('insights', [])
                 if insights:
                     with st.expander(f"🔍 {company_name} Insights", expanded=False):
+                        if company_research.get('cached'):
+                            researched_at = time.strftime("%Y-%m-%d", time.localtime(company_research.get('researched_at') or 0))
+                            st.caption(f"♻️ Reused research from {researched_at}")
                         for i, insight in enumerate(insights, 1):
                             st.write(f"**{i}.** {insight}")
+                        sources = company_research.get('sources', [])
+                        if sources:
+                            st.write("**Sources:** " + ", ".join(sources))
         else:
             st.info("No research insights gathered")
 
@@ -652,10 +2226,28 @@ def render_results_tabs(results: Dict[str, Any]) -> None:
             st.info("No emails generated")
 
 
+def render_budget_summary(budget: BatchBudget) -> None:
+    summary = budget.summary()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Qualified Emails", f"{summary['qualified_emails']}/{summary['emails']}")
+    with col2:
+        st.metric("Est. Cost", f"${summary['cost_usd']:.2f}", help=f"{summary['tokens_used']:,} tokens")
+    with col3:
+        st.metric("Qualified / $", summary["qualified_per_dollar"])
+    with col4:
+        st.metric("Qualified / min", summary["qualified_per_minute"])
+
+
 # ------------------- Main App -------------------
 
 def main() -> None:
     st.set_page_config(page_title="GTM B2B Outreach - Multi-Agent Pipeline", layout="wide")
+    # Agent memory is partitioned per browser session, so users never see each other's runs. The id is
+    # kept in the URL, so reloading (or reopening) the link after a restart picks the same context back up.
+    if "memory" not in st.query_params:
+        st.query_params["memory"] = uuid.uuid4().hex
+    st.session_state["memory_partition"] = st.query_params["memory"]
 
     # Sidebar: API keys and settings
     st.sidebar.header("🔑 API Configuration")
@@ -671,6 +2263,41 @@ def main() -> None:
         st.sidebar.info("Get OpenAI key from: https://platform.openai.com/api-keys")
         st.sidebar.info("Get Exa key from: https://exa.ai/")
 
+    st.sidebar.header("🗄️ Research Cache")
+    research_max_age_days = st.sidebar.number_input(
+        "Reuse company research younger than (days)", min_value=0, max_value=365, value=14,
+        help="Companies researched more recently reuse their stored insights. 0 always re-researches."
+    )
+
+    st.sidebar.header("⚖️ Execution Budget")
+    token_budget = st.sidebar.number_input(
+        "Token budget per run/batch (0 = unlimited)", min_value=0, max_value=50_000_000, value=0, step=50_000
+    )
+    time_budget_minutes = st.sidebar.number_input(
+        "Time budget per run/batch (minutes, 0 = unlimited)", min_value=0, max_value=1440, value=0
+    )
+    phone_top_k = st.sidebar.number_input(
+        "Phone lookup for top N companies per row", min_value=0, max_value=10, value=2,
+        help="Companies are ranked by fit (why_fit specificity, growth signals, size); only the top N get the phone stage."
+    )
+
+    st.sidebar.header("✉️ Email Personalization")
+    personalize_with_model = st.sidebar.checkbox(
+        "Per-contact lines with gpt-4o-mini", value=False,
+        help="Emails are drafted once per company; each contact's role-specific line comes from gpt-4o-mini instead of local templates."
+    )
+
+    with st.sidebar.expander("🧪 Diagnostics"):
+        trace_enabled = st.checkbox(
+            "Record trace", value=bool(os.getenv("GTM_TRACE")),
+            help="Writes nested spans for stages, model calls, tools, JSON parsing and rendering as a Chrome/Perfetto trace."
+        )
+        trace_path = st.text_input("Trace file", value=os.getenv("GTM_TRACE") or cache_path("trace.json"))
+        sample_interval_ms = st.number_input(
+            "Sampling profiler interval (ms, 0 = off)", min_value=0, max_value=1000, value=0,
+            help="Also writes collapsed stacks next to the trace file (.folded) for flamegraph/speedscope."
+        )
+
     # Main interface
     st.title("🎯 GTM B2B Outreach Multi-Agent Pipeline")
     st.markdown("""
@@ -679,7 +2306,7 @@ def main() -> None:
     - Upload a CSV/Excel with any columns (we'll use all non-empty values per row as the target description), **or**
     - Use the manual form below.
 
-    Each row runs sequentially and shows results immediately.
+    Each row runs sequentially and shows results immediately; near-duplicate rows share a single run.
     """)
 
     # ------------------- File Upload Mode -------------------
@@ -707,6 +2334,12 @@ def main() -> None:
         calendar_link = st.text_input("Calendar link (optional)", value="", placeholder="https://calendly.com/yourname")
         num_companies = st.number_input("Number of companies to find per row", min_value=1, max_value=10, value=3)
         email_style = st.selectbox("Email style", ["Professional","Casual","Cold","Consultative"], index=0)
+        collapse_duplicates = st.checkbox(
+            "Collapse duplicate rows", value=True,
+            help="Rows that differ only in case, column order, punctuation or filler words (and, the, companies...) "
+                 "share one pipeline run. Rows differing in any other word, such as region, size or industry, "
+                 "always run separately."
+        )
 
         if st.button("🚀 Run Outreach for All Rows"):
             if not openai_key or not exa_key:
@@ -714,85 +2347,110 @@ def main() -> None:
             elif not offering_desc.strip() or not sender_name.strip() or not sender_company.strip():
                 st.error("❌ Please fill offering, sender name, and sender company")
             else:
-                all_results = []
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                results_container = st.container()
-
-                combined_emails_for_csv: List[Dict[str, str]] = []
-
-                total_rows = len(df)
-                for idx, row in df.iterrows():
-                    # Build target_desc from all non-empty cell values
-                    row_values = [str(v) for v in row if pd.notna(v) and str(v).strip()]
-                    row_text = " | ".join(row_values) if row_values else "No row data provided"
-
-                    status_text.info(f"▶️ Row {idx+1}/{total_rows}: {row_text[:80]}...")
-                    try:
-                        result = run_pipeline(
-                            target_desc=row_text,
-                            offering_desc=offering_desc.strip(),
-                            sender_name=sender_name.strip(),
-                            sender_company=sender_company.strip(),
-                            calendar_link=calendar_link.strip() or None,
-                            num_companies=int(num_companies),
-                            email_style=email_style
+                with tracing_session(trace_enabled, trace_path, float(sample_interval_ms)):
+                    store = ResultStore()
+                    progress_bar = st.progress(0)
+                    status_text = st.empty()
+                    results_container = st.container()
+
+                    budget = BatchBudget(int(token_budget), float(time_budget_minutes))
+
+                    row_texts = []
+                    for _, row in df.iterrows():
+                        # Build target_desc from all non-empty cell values
+                        row_values = [str(v) for v in row if pd.notna(v) and str(v).strip()]
+                        row_texts.append(" | ".join(row_values) if row_values else "No row data provided")
+
+                    total_rows = len(row_texts)
+                    clusters = cluster_duplicate_rows(row_texts) if collapse_duplicates else [[i] for i in range(total_rows)]
+                    if len(clusters) < total_rows:
+                        st.info(
+                            f"🧬 Collapsed {total_rows} rows into {len(clusters)} unique targets "
+                            f"({total_rows - len(clusters)} pipeline runs saved)"
                         )
-                        all_results.append({"row": idx+1, "target_desc": row_text, "result": result})
-
-                        # Collect emails for combined CSV
-                        for email in result.get("emails", []):
-                            combined_emails_for_csv.append({
-                                "Row": idx + 1,
-                                "Company": email.get("company", ""),
-                                "Contact": email.get("contact", ""),
-                                "Subject": email.get("subject", ""),
-                                "Body": email.get("body", ""),
-                                "Personalization": email.get("personalization_used", "")
-                            })
-
-                        # Show per-row results immediately
-                        with results_container.expander(f"Row {idx+1} Results", expanded=False):
-                            st.markdown(f"**Target (auto-generated from row):** {row_text}")
-                            render_results_tabs(result)
-
-                    except Exception as e:
-                        st.error(f"Row {idx+1} failed: {str(e)}")
-                        all_results.append({"row": idx+1, "target_desc": row_text, "error": str(e)})
-
-                    progress_bar.progress(int(((idx+1) / total_rows) * 100))
-
-                st.session_state["batch_results"] = all_results
-                st.success("🎉 Batch processing completed!")
-
-                # Batch summary + export
-                st.divider()
-                st.header("📊 Batch Results Summary")
-
-                for item in all_results:
-                    if "error" in item:
-                        st.error(f"Row {item['row']} ❌ Error: {item['error']}")
-                    else:
-                        res = item["result"]
-                        st.success(f"Row {item['row']} ✅ {len(res.get('emails', []))} emails generated")
-
-                # Export JSON (full results)
-                st.download_button(
-                    "💾 Download All Results (JSON)",
-                    data=json.dumps(all_results, indent=2),
-                    file_name="batch_outreach_results.json",
-                    mime="application/json"
-                )
 
-                # Export CSV (combined emails)
-                if combined_emails_for_csv:
-                    df_emails = pd.DataFrame(combined_emails_for_csv)
-                    st.download_button(
-                        "📊 Download All Emails (CSV)",
-                        data=df_emails.to_csv(index=False),
-                        file_name=f"batch_emails_{sender_company.replace(' ','_')}.csv",
-                        mime="text/csv"
-                    )
+                    for cluster_idx, cluster in enumerate(clusters):
+                        rep = cluster[0]
+                        row_text = row_texts[rep]
+
+                        status_text.info(f"▶️ Row {rep+1}/{total_rows}: {row_text[:80]}...")
+                        try:
+                            with trace_span(f"row {rep+1}", "batch", rows=len(cluster)):
+                                result = run_pipeline(
+                                    target_desc=row_text,
+                                    offering_desc=offering_desc.strip(),
+                                    sender_name=sender_name.strip(),
+                                    sender_company=sender_company.strip(),
+                                    calendar_link=calendar_link.strip() or None,
+                                    num_companies=int(num_companies),
+                                    email_style=email_style,
+                                    research_max_age_days=float(research_max_age_days),
+                                    budget=budget,
+                                    phone_top_k=int(phone_top_k),
+                                    memory_partition=st.session_state["memory_partition"],
+                                    personalize_with_model=personalize_with_model
+                                )
+
+                            # Every row in the cluster references the representative's stored run
+                            run_id = store.add_run(result)
+                            for idx in cluster:
+                                store.add_row(idx+1, row_texts[idx], run_id, shared_with_row=None if idx == rep else rep+1)
+
+                            # Show per-row results immediately
+                            with results_container.expander(f"Row {rep+1} Results", expanded=False):
+                                st.markdown(f"**Target (auto-generated from row):** {row_text}")
+                                if len(cluster) > 1:
+                                    st.caption("Also applies to near-duplicate rows: " + ", ".join(str(i + 1) for i in cluster[1:]))
+                                render_results_tabs(result)
+
+                        except Exception as e:
+                            st.error(f"Row {rep+1} failed: {str(e)}")
+                            for idx in cluster:
+                                store.add_row(idx+1, row_texts[idx], error=str(e))
+
+                        progress_bar.progress(int(((cluster_idx+1) / len(clusters)) * 100))
+
+                    st.session_state["batch_results"] = store
+                    st.success("🎉 Batch processing completed!")
+                    if trace_enabled:
+                        st.caption(f"🧪 Trace will be written to {trace_path} (open in https://ui.perfetto.dev)")
+
+                    # Batch summary + export
+                    st.divider()
+                    st.header("📊 Batch Results Summary")
+
+                    for rec in store.sorted_rows():
+                        if rec.error is not None:
+                            st.error(f"Row {rec.row} ❌ Error: {rec.error}")
+                        else:
+                            shared_note = f" (shared with Row {rec.shared_with_row})" if rec.shared_with_row else ""
+                            st.success(f"Row {rec.row} ✅ {store.email_count(rec.run_id)} emails generated{shared_note}")
+
+                    render_budget_summary(budget)
+
+                    # Exports are streamed from the store into a private temp dir; each download
+                    # button reads its file into memory right away, so the dir can go afterwards.
+                    with tempfile.TemporaryDirectory(prefix="gtm-export-") as export_dir:
+                        # Export JSON (full results)
+                        json_path = store.write_json(os.path.join(export_dir, "batch_outreach_results.json"))
+                        with open(json_path, "rb") as f:
+                            st.download_button(
+                                "💾 Download All Results (JSON)",
+                                data=f,
+                                file_name="batch_outreach_results.json",
+                                mime="application/json"
+                            )
+
+                        # Export CSV (combined emails)
+                        csv_path = os.path.join(export_dir, "batch_emails.csv")
+                        if store.write_csv(csv_path):
+                            with open(csv_path, "rb") as f:
+                                st.download_button(
+                                    "📊 Download All Emails (CSV)",
+                                    data=f,
+                                    file_name=f"batch_emails_{sender_company.replace(' ','_')}.csv",
+                                    mime="text/csv"
+                                )
 
     # ------------------- Manual Mode (Original Form) -------------------
     else:
@@ -829,13 +2487,21 @@ def main() -> None:
                 st.error("❌ Please fill all required fields (target, offering, name, company)")
             else:
                 try:
-                    results = run_pipeline(
-                        target_desc.strip(), offering_desc.strip(),
-                        sender_name.strip(), sender_company.strip(),
-                        calendar_link.strip() or None, int(num_companies), email_style
-                    )
+                    budget = BatchBudget(int(token_budget), float(time_budget_minutes))
+                    with tracing_session(trace_enabled, trace_path, float(sample_interval_ms)):
+                        results = run_pipeline(
+                            target_desc.strip(), offering_desc.strip(),
+                            sender_name.strip(), sender_company.strip(),
+                            calendar_link.strip() or None, int(num_companies), email_style,
+                            research_max_age_days=float(research_max_age_days),
+                            budget=budget,
+                            phone_top_k=int(phone_top_k),
+                            memory_partition=st.session_state["memory_partition"],
+                            personalize_with_model=personalize_with_model
+                        )
                     st.session_state["gtm_results"] = results
                     st.success("🎉 Manual run completed!")
+                    render_budget_summary(budget)
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
 
@@ -844,7 +2510,8 @@ def main() -> None:
     if results:
         st.divider()
         st.header("📊 Single Run Results")
-        render_results_tabs(results)
+        with tracing_session(trace_enabled, trace_path, float(sample_interval_ms)):
+            render_results_tabs(results)
 
         # Export options for single run (emails CSV + full JSON)
         emails = results.get("emails", [])
@@ -894,4 +2561,7 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    if "--benchmark-results" in sys.argv:
+        print(json.dumps(benchmark_result_store(), indent=2))
+    else:
+        main()
@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+from agno.models.message import Message
+from agno.run.response import RunResponse, RunStatus
+
+from GTM_Outreach_Agent import BoundedSqliteMemory
+
+
+def finished_run(run_id, content):
+    return RunResponse(
+        run_id=run_id, content=content, status=RunStatus.completed,
+        messages=[
+            Message(role="user", content="prompt with jane@acme.com"),
+            Message(role="tool", content="raw search results", tool_call_id="t1"),
+            Message(role="assistant", content=content),
+        ],
+    )
+
+
+def test_restored_runs_carry_only_the_final_answer(tmp_path):
+    db_file = str(tmp_path / "memory.sqlite")
+    BoundedSqliteMemory(db_file, "session-a").add_run("finder", finished_run("r1", '{"companies": []}'))
+
+    messages = BoundedSqliteMemory(db_file, "session-a").get_messages_from_last_n_runs("finder")
+    assert [(m.role, m.content) for m in messages] == [("assistant", '{"companies": []}')]
+    assert BoundedSqliteMemory(db_file, "session-b").get_messages_from_last_n_runs("finder") == []
+
+
+def test_eviction_drops_least_recently_used_rows(tmp_path):
+    db_file = str(tmp_path / "memory.sqlite")
+    memory = BoundedSqliteMemory(db_file, "p", max_rows=3)
+    memory.add_run("old", finished_run("r0", "kept because it was read"))
+    for i in range(1, 4):
+        memory.add_run(f"s{i}", finished_run(f"r{i}", f"answer {i}"))
+        if i == 1:
+            BoundedSqliteMemory(db_file, "p").get_runs("old")
+
+    with sqlite3.connect(db_file) as conn:
+        kept = {row[0] for row in conn.execute("SELECT run_id FROM agent_outputs")}
+    assert kept == {"r0", "r2", "r3"}
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+from GTM_Outreach_Agent import EmailPatternIndex
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setenv("GTM_CACHE_DIR", str(tmp_path))
+    return EmailPatternIndex()
+
+
+def test_repeated_address_counts_once(index):
+    for _ in range(3):
+        index.learn("acme.com", "Jane Doe", "jane.doe@acme.com")
+    assert index.pattern_for("acme.com") is None
+    assert index.infer("acme.com", "Bob Li") is None
+
+
+def test_pattern_needs_distinct_agreeing_samples(index):
+    index.learn("acme.com", "Jane Doe", "jane.doe@acme.com")
+    index.learn("acme.com", "Bob Li", "Bob.Li@acme.com")
+    assert index.infer("acme.com", "Dr. José Núñez") == ("jose.nunez@acme.com", "first.last")
+
+    index.learn("acme.com", "Al Xu", "axu@acme.com")
+    assert index.pattern_for("acme.com") is None
+
+
+def test_free_mail_is_ignored(index):
+    assert index.learn("acme.com", "Jane Doe", "jane.doe@gmail.com") is None
+    assert "acme.com" not in index.data
+
+
+def test_concurrent_indexes_merge_instead_of_overwriting(index):
+    other = EmailPatternIndex()
+    index.learn("acme.com", "Jane Doe", "jane.doe@acme.com")
+    other.learn("acme.com", "Bob Li", "bob.li@acme.com")
+    other.learn("globex.com", "Al Xu", "al.xu@globex.com")
+    index.save()
+    other.save()
+
+    reloaded = EmailPatternIndex()
+    assert reloaded.pattern_for("acme.com") == ("first.last", "acme.com")
+    assert set(reloaded.data) == {"acme.com", "globex.com"}
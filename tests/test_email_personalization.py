@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+from GTM_Outreach_Agent import (
+    ROLE_LINE_TEMPLATES,
+    local_role_line,
+    match_drafts_to_companies,
+    personalize_email_drafts,
+)
+
+DRAFT_BODY = "Hi {first_name},\n\nSaw your Series B.\n\n{role_line}\n\nBest,\nSam"
+
+
+def contacts_for(*companies):
+    return [
+        {"name": name, "contacts": [{"full_name": full_name, "title": "VP Sales"}]}
+        for name, full_name in companies
+    ]
+
+
+@pytest.mark.parametrize("style", sorted(ROLE_LINE_TEMPLATES))
+def test_role_lines_follow_the_email_style(style):
+    line = local_role_line("VP Sales", "Acme", style)
+    assert "pipeline and win rates" in line
+    assert line == ROLE_LINE_TEMPLATES[style].format(title="VP Sales", company="Acme", focus="pipeline and win rates")
+    assert len({local_role_line("VP Sales", "Acme", s) for s in ROLE_LINE_TEMPLATES}) == len(ROLE_LINE_TEMPLATES)
+
+
+def test_first_name_skips_titles_and_keeps_case():
+    drafts = [{"company": "Acme", "subject": "Idea for {first_name}", "body": DRAFT_BODY}]
+    emails = personalize_email_drafts(drafts, contacts_for(("Acme", "Dr. Jane McKay-Smith, PhD")))
+    assert emails[0]["subject"] == "Idea for Jane"
+    assert emails[0]["body"].startswith("Hi Jane,")
+
+
+def test_drafts_match_similar_names_then_order(caplog):
+    drafts = [
+        {"company": "Acme Inc.", "body": "a"},
+        {"company": "Something else", "body": "b"},
+    ]
+    matched = match_drafts_to_companies(drafts, ["Acme", "Globex Corporation"])
+    assert matched["acme"]["body"] == "a"
+    assert matched["globex corporation"]["body"] == "b"
+    assert caplog.records == []
+
+
+def test_unmatched_drafts_are_logged(caplog):
+    drafts = [{"company": "Acme", "body": "a"}, {"company": "Initech", "body": "b"}]
+    matched = match_drafts_to_companies(drafts, ["Acme"])
+    assert list(matched) == ["acme"]
+    assert [r.levelname for r in caplog.records] == ["WARNING"]
+    assert "Initech" in caplog.text
+
+
+def test_missing_first_name_uses_the_same_fallback_in_subject_and_body():
+    drafts = [{"company": "Acme", "subject": "{first_name}, quick idea", "body": DRAFT_BODY}]
+    emails = personalize_email_drafts(drafts, contacts_for(("Acme", "Dr.")))
+    assert emails[0]["subject"] == "there, quick idea"
+    assert emails[0]["body"].startswith("Hi there,")
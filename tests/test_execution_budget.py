@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+import GTM_Outreach_Agent as gtm
+from GTM_Outreach_Agent import (
+    SPECULATIVE_STAGES,
+    STAGE_ESTIMATES,
+    BatchBudget,
+    EmailPatternIndex,
+    SpeculativeCompanyDispatcher,
+    plan_companies,
+)
+
+SPECULATIVE_TOKENS = sum(STAGE_ESTIMATES[s][1] for s in SPECULATIVE_STAGES)
+STRONG = {
+    "name": "Acme",
+    "why_fit": "Hiring 40 account executives across EMEA after a Series B round to expand outbound sales",
+    "growth_signals": ["Series B", "hiring"],
+    "employee_count": "200-500",
+}
+WEAK = {"name": "Vague Co", "why_fit": "Could be a fit"}
+
+
+def test_concurrent_reservations_never_exceed_the_budget():
+    budget = BatchBudget(max_tokens=SPECULATIVE_TOKENS * 3)
+    barrier = threading.Barrier(10)
+
+    def reserve():
+        barrier.wait()
+        return budget.reserve(SPECULATIVE_STAGES)
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        granted = [f.result() for f in [executor.submit(reserve) for _ in range(10)]]
+    assert sum(granted) == 3
+    assert budget.reserved_tokens == SPECULATIVE_TOKENS * 3
+
+
+def make_dispatcher(budget, executor):
+    dispatcher = SpeculativeCompanyDispatcher(executor, "target", "offering", None, None, 14, budget)
+    dispatcher._find_contacts = lambda company, reserved: budget.release("contacts") or [company]
+    dispatcher._research = lambda company, reserved: budget.release("research") or []
+    return dispatcher
+
+
+def test_dispatch_holds_back_low_scoring_companies():
+    budget = BatchBudget()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        dispatcher = make_dispatcher(budget, executor)
+        dispatcher.dispatch(WEAK)
+        dispatcher.dispatch(STRONG)
+        assert set(dispatcher.futures) == {"acme"}
+        contacts, _ = dispatcher.collect([STRONG, WEAK])
+    assert [c["name"] for c in contacts] == ["Acme", "Vague Co"]
+    assert budget.reserved_tokens == 0
+
+
+def test_dispatch_stops_once_reservations_fill_the_budget():
+    budget = BatchBudget(max_tokens=SPECULATIVE_TOKENS)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        dispatcher = make_dispatcher(budget, executor)
+        running = threading.Event()
+        find_contacts = dispatcher._find_contacts
+        dispatcher._find_contacts = lambda company, reserved: running.wait() and find_contacts(company, reserved)
+        dispatcher.dispatch(STRONG)
+        dispatcher.dispatch({**STRONG, "name": "Globex"})
+        running.set()
+    assert dispatcher.reserved == {"acme"}
+    assert budget.reserved_tokens == 0
+
+
+def test_companies_dropped_from_the_final_list_are_cancelled_and_released():
+    budget = BatchBudget()
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        dispatcher = make_dispatcher(budget, executor)
+        find_contacts = dispatcher._find_contacts
+        dispatcher._find_contacts = lambda company, reserved: release.wait() and find_contacts(company, reserved)
+        dispatcher.dispatch(STRONG)
+        dispatcher.dispatch({**STRONG, "name": "Globex"})
+        threading.Timer(0.2, release.set).start()
+        contacts, _ = dispatcher.collect([STRONG])
+
+    assert [c["name"] for c in contacts] == ["Acme"]
+    assert all(future.cancelled() for future in dispatcher.futures["globex"])
+    assert budget.reserved_tokens == 0
+
+
+def test_contacts_keep_the_requested_company_name(tmp_path, monkeypatch):
+    monkeypatch.setenv("GTM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(gtm, "create_contact_finder_agent", lambda partition: None)
+    monkeypatch.setattr(gtm, "run_contact_finder", lambda agent, companies, *args: [
+        {"name": "ACME, Inc.", "contacts": [{"full_name": "Jane Doe"}]}
+    ])
+    dispatcher = SpeculativeCompanyDispatcher(None, "target", "offering", EmailPatternIndex(), None, 14, BatchBudget())
+    assert dispatcher._find_contacts(STRONG, reserved=False) == [
+        {"name": "Acme", "contacts": [{"full_name": "Jane Doe"}]}
+    ]
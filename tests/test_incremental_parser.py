@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+from GTM_Outreach_Agent import IncrementalArrayParser
+
+COMPANIES = [
+    {"name": "Acme {Labs}", "why_fit": "Uses [brackets] and } braces { in text"},
+    {"name": "Quote \"Co\"", "why_fit": "Escaped \\\" quote and backslash \\\\", "tags": [{"k": "v"}]},
+    {"name": "Globex", "growth_signals": ["]", "}"]},
+]
+TEXT = "Here you go:\n```json\n" + json.dumps({"companies": COMPANIES, "note": {"x": 1}}, indent=2) + "\n```"
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalArrayParser("companies")
+    seen = []
+    for start in range(0, len(text), size):
+        seen.append(parser.feed(text[start:start + size]))
+    return parser, seen
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(TEXT)])
+def test_objects_with_braces_and_brackets_in_strings_parse_at_any_chunking(size):
+    parser, seen = feed_in_chunks(TEXT, size)
+    assert [c for chunk in seen for c in chunk] == COMPANIES
+    assert parser.done
+
+
+def test_each_object_is_yielded_as_soon_as_it_closes():
+    first_close = TEXT.rindex("}", 0, TEXT.index("Quote")) + 1
+    parser = IncrementalArrayParser("companies")
+    assert parser.feed(TEXT[:first_close - 1]) == []
+    assert parser.feed(TEXT[first_close - 1:first_close]) == [COMPANIES[0]]
+
+
+def test_key_split_across_chunks_is_found():
+    parser = IncrementalArrayParser("companies")
+    assert parser.feed('{"compa') == []
+    assert parser.feed('nies": [{"name": "A"}') == [{"name": "A"}]
+    assert parser.feed(', {"name": "B"}]}') == [{"name": "B"}]
+
+
+def test_objects_after_the_array_are_ignored():
+    parser = IncrementalArrayParser("companies")
+    assert parser.feed('{"companies": [], "other": [{"name": "X"}]}') == []
+    assert parser.done
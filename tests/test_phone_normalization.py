@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+from GTM_Outreach_Agent import normalize_phone_results
+
+
+def normalize(*numbers, default_country_code="1"):
+    phones = [{"name": "Acme", "contacts": [
+        {"full_name": f"Contact {i}", "phone_number": n, "phone_type": "direct", "verified": True}
+        for i, n in enumerate(numbers)
+    ]}]
+    result = normalize_phone_results(phones, default_country_code)
+    return [c["phone_number"] for c in result[0]["contacts"]] if result else []
+
+
+def test_nanp_national_and_extension():
+    result = normalize_phone_results([{"name": "Acme", "contacts": [
+        {"full_name": "Jane Doe", "phone_number": "(415) 867-5309 x12", "phone_type": "Desk", "verified": "true"},
+    ]}])
+    contact = result[0]["contacts"][0]
+    assert contact["phone_number"] == "+14158675309"
+    assert contact["extension"] == "12"
+    assert contact["phone_type"] == "direct"
+    assert contact["verified"] is True
+
+
+def test_international_prefixes():
+    assert normalize("+44 20 7946 0958", "0049 30 1234567") == ["+442079460958", "+49301234567"]
+
+
+def test_bracketed_trunk_zero_after_country_code_is_dropped():
+    assert normalize("+49 (0)30 1234567") == ["+49301234567"]
+
+
+def test_trunk_zero_is_not_assumed_to_be_nanp():
+    assert normalize("020 7946 0958") == []
+    assert normalize("020 7946 0958", default_country_code="44") == ["+442079460958"]
+
+
+def test_invalid_and_placeholder_numbers_are_dropped():
+    assert normalize("+1-555-123-4567", "1 212 555 0142", "000-000-0000", "123", "") == []
+
+
+def test_duplicates_collapse_and_prefer_verified():
+    result = normalize_phone_results([{"name": "Acme", "contacts": [
+        {"full_name": "Jane Doe", "phone_number": "415.867.5309", "verified": False, "source": "blog"},
+        {"full_name": "Jane Doe", "phone_number": "+1 (415) 867-5309", "verified": True, "source": "website"},
+    ]}])
+    assert result == [{"name": "Acme", "contacts": [
+        {"full_name": "Jane Doe", "phone_number": "+14158675309", "phone_type": "unknown", "verified": True, "source": "website"},
+    ]}]
+
+
+def test_company_without_a_name_keeps_its_numbers():
+    result = normalize_phone_results([{"name": None, "contacts": [
+        {"full_name": "Jane Doe", "phone_number": "+1 415 555 2671"},
+    ]}])
+    assert result[0]["name"] == ""
+    assert result[0]["contacts"][0]["phone_number"] == "+14155552671"
+
+
+def test_empty_input():
+    assert normalize_phone_results([]) == []
+    assert normalize_phone_results([{"name": "Acme", "contacts": []}]) == []
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+import GTM_Outreach_Agent as gtm
+from GTM_Outreach_Agent import ResearchStore, run_research_incremental
+
+ACME = {"name": "Acme", "website": "https://www.acme.com"}
+GLOBEX = {"name": "Globex", "website": "https://globex.io"}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("GTM_CACHE_DIR", str(tmp_path))
+    return ResearchStore()
+
+
+@pytest.fixture
+def research_calls(monkeypatch):
+    calls = []
+
+    def fake_run_research(agent, companies):
+        calls.append([c["name"] for c in companies])
+        return [{"name": f"{c['name']}, Inc.", "insights": [f"{c['name']} raised a Series B"], "sources": ["https://x"]}
+                for c in companies]
+
+    monkeypatch.setattr(gtm, "run_research", fake_run_research)
+    return calls
+
+
+def test_freshness_is_decided_by_age(store):
+    store.put(ACME, {"insights": ["a"]}, now=time.time() - 10 * 86400)
+    assert store.is_fresh(ACME, 14)
+    assert not store.is_fresh(ACME, 7)
+    assert not store.is_fresh(ACME, 0)
+    assert not store.is_fresh(GLOBEX, 14)
+
+
+def test_fresh_research_is_reused_without_a_model_call(store, research_calls):
+    first = run_research_incremental(None, [ACME], store, 14)
+    second = run_research_incremental(None, [ACME, GLOBEX], store, 14)
+
+    assert research_calls == [["Acme"], ["Globex"]]
+    assert first == [{"name": "Acme", "insights": ["Acme raised a Series B"], "sources": ["https://x"]}]
+    assert [r["name"] for r in second] == ["Acme", "Globex"]
+    assert second[0]["cached"] and "cached" not in second[1]
+    assert ResearchStore().is_fresh(GLOBEX, 14)
+
+
+def test_respelled_company_names_are_still_stored_and_returned(store, monkeypatch):
+    monkeypatch.setattr(gtm, "run_research", lambda agent, companies: [
+        {"name": "Globex Corporation", "insights": ["g"]},
+        {"name": "ACME Inc", "insights": ["a"]},
+    ])
+    research = run_research_incremental(None, [ACME, GLOBEX], store, 14)
+    assert research == [{"name": "Acme", "insights": ["a"]}, {"name": "Globex", "insights": ["g"]}]
+    assert store.is_fresh(ACME, 14) and store.is_fresh(GLOBEX, 14)
+
+
+def test_single_company_takes_the_only_entry(store, monkeypatch):
+    monkeypatch.setattr(gtm, "run_research", lambda agent, companies: [{"name": "ACME Holdings Group", "insights": ["a"]}])
+    assert run_research_incremental(None, [ACME], store, 14) == [{"name": "Acme", "insights": ["a"]}]
+    assert store.is_fresh(ACME, 14)
+
+
+def test_concurrent_stores_merge_and_keep_the_newest_research(store):
+    other = ResearchStore()
+    store.put(ACME, {"insights": ["older"]}, now=1_000)
+    other.put(ACME, {"insights": ["newer"]}, now=2_000)
+    other.put(GLOBEX, {"insights": ["g"]}, now=2_000)
+    other.save()
+    store.save()
+
+    reloaded = ResearchStore()
+    assert reloaded.data["acme.com"]["insights"] == ["newer"]
+    assert reloaded.data["globex.io"]["insights"] == ["g"]
@@ -0,0 +1,67 @@
+import csv
+import json
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+from GTM_Outreach_Agent import ResultStore
+
+
+def make_result(n):
+    company = f"Company {n}"
+    return {
+        "companies": [{"name": company}],
+        "contacts": [],
+        "phones": [],
+        "research": [],
+        "emails": [
+            {"company": company, "contact": f"Person {j}", "subject": f"Idea {n}-{j}",
+             "body": f"Hi Person {j},\n\n\"quoted\", comma" + "x" * 500, "personalization_used": "funding"}
+            for j in range(2)
+        ],
+    }
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("GTM_CACHE_DIR", str(tmp_path))
+    store = ResultStore(spill_threshold_mb=0.001)
+    first = store.add_run(make_result(0))
+    second = store.add_run(make_result(1))
+    store.add_row(3, "row three", second)
+    store.add_row(1, "row one", first)
+    store.add_row(2, "row one again", first, shared_with_row=1)
+    store.add_row(4, "row four", error="boom")
+    return store
+
+
+def test_spilled_runs_round_trip(store):
+    assert store.runs[0].result is None
+    assert store.memory_bytes <= store.spill_threshold
+    assert store.get_result(0) == make_result(0)
+    assert store.get_result(1) == make_result(1)
+    assert [e.subject for e in store.get_emails(0)] == ["Idea 0-0", "Idea 0-1"]
+    assert store.email_count(0) == 2
+
+
+def test_json_export_keeps_rows_shared_runs_and_errors(store, tmp_path):
+    with open(store.write_json(str(tmp_path / "out.json")), encoding="utf-8") as f:
+        exported = json.load(f)
+    assert [item["row"] for item in exported] == [1, 2, 3, 4]
+    assert exported[0]["result"] == make_result(0)
+    assert exported[1]["shared_with_row"] == 1 and exported[1]["result"] == make_result(0)
+    assert exported[2]["result"] == make_result(1) and "shared_with_row" not in exported[2]
+    assert exported[3] == {"row": 4, "target_desc": "row four", "error": "boom"}
+
+
+def test_csv_export_has_one_line_per_row_and_email(store, tmp_path):
+    path = str(tmp_path / "out.csv")
+    assert store.write_csv(path) == 6
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["Row"], r["Subject"]) for r in rows] == [
+        ("1", "Idea 0-0"), ("1", "Idea 0-1"), ("2", "Idea 0-0"), ("2", "Idea 0-1"), ("3", "Idea 1-0"), ("3", "Idea 1-1"),
+    ]
+    assert rows[0]["Body"] == make_result(0)["emails"][0]["body"]
@@ -0,0 +1,40 @@
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+from GTM_Outreach_Agent import cluster_duplicate_rows
+
+ROW = ("B2B SaaS companies | Series B venture backed | 200-1000 employees | using Salesforce HubSpot Marketo | "
+       "revenue operations pain | expanding sales teams rapidly | region US")
+
+
+def test_case_column_order_and_stopwords_are_ignored():
+    reordered = "region us | " + ROW.lower().replace(" | region us", "")
+    reworded = ROW.replace("B2B SaaS companies", "the B2B SaaS firms") + " | region US"
+    assert cluster_duplicate_rows([ROW, reordered, reworded]) == [[0, 1, 2]]
+
+
+@pytest.mark.parametrize("change", [
+    ("region US", "region UK"),
+    ("region US", "region Germany"),
+    ("200-1000", "50-200"),
+    ("SaaS", "Fintech"),
+])
+def test_rows_differing_in_any_content_word_are_not_merged(change):
+    assert cluster_duplicate_rows([ROW, ROW.replace(*change)]) == [[0], [1]]
+
+
+def test_extra_words_keep_rows_apart():
+    assert cluster_duplicate_rows([ROW, ROW + " | growing"]) == [[0], [1]]
+
+
+def test_large_sheets_cluster_in_linear_time():
+    rows = [f"{ROW} | account a{i}" for i in range(10_000)] + [ROW.lower()] * 3
+    started = time.perf_counter()
+    clusters = cluster_duplicate_rows([ROW] + rows)
+    assert time.perf_counter() - started < 2
+    assert len(clusters) == 10_001
+    assert clusters[0] == [0, 10_001, 10_002, 10_003]
@@ -0,0 +1,84 @@
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("agno")
+
+from GTM_Outreach_Agent import submit_in_context, trace_span, tracing_session
+
+
+def span_names(path):
+    # JSON Array Format traces may omit the closing bracket
+    with open(path, encoding="utf-8") as f:
+        return [e["name"] for e in json.loads(f.read() + "]") if e["ph"] == "X"]
+
+
+def outside_span():
+    with trace_span("other"):
+        pass
+
+
+def test_spans_outside_the_session_context_are_not_recorded(tmp_path):
+    path = str(tmp_path / "trace.json")
+    with tracing_session(True, path):
+        with trace_span("mine"):
+            pass
+        other = threading.Thread(target=outside_span)
+        other.start()
+        other.join()
+    assert span_names(path) == ["mine"]
+
+
+def test_worker_spans_finishing_after_the_session_are_kept(tmp_path):
+    path = str(tmp_path / "trace.json")
+    release = threading.Event()
+
+    def worker():
+        release.wait()
+        with trace_span("late"):
+            pass
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with tracing_session(True, path):
+            future = submit_in_context(executor, worker)
+        release.set()
+        future.result()
+    assert span_names(path) == ["late"]
+
+
+def record_sessions(path, prefix):
+    for i in range(20):
+        with tracing_session(True, path):
+            with trace_span(f"{prefix}-{i}"):
+                pass
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_processes_appending_to_one_file_keep_every_span(tmp_path):
+    path = str(tmp_path / "trace.json")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=record_sessions, args=(path, f"p{n}")) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sorted(span_names(path)) == sorted(f"p{n}-{i}" for n in range(4) for i in range(20))
+
+
+def test_large_trace_files_are_rotated(tmp_path):
+    path = str(tmp_path / "trace.json")
+    with tracing_session(True, path):
+        with trace_span("first"):
+            pass
+    with tracing_session(True, path) as tracer:
+        tracer.max_bytes = 1
+        with trace_span("second"):
+            pass
+    assert span_names(path + ".1") == ["first"]
+    assert span_names(path) == ["second"]
+    assert os.path.getsize(path) < 1024